@@ -2,11 +2,31 @@ import os
 os.environ["TRANSFORMERS_OFFLINE"] = "1"
 
 import streamlit as st
-import pandas as pd
 import requests # The library for making web requests
+from requests.adapters import HTTPAdapter
 
 # Set the base URL for your FastAPI backend
 API_URL = "http://127.0.0.1:8000"
+APPLICATIONS_PAGE_SIZE = 50
+# Seconds a GET response is reused across reruns; any change made from this app clears the cache
+API_CACHE_SECONDS = 30
+STATUS_OPTIONS = ["Applied", "Shortlisted", "Not Shortlisted"]
+
+# --- Backend Client ---
+@st.cache_resource
+def get_session():
+    """One keep-alive HTTP session shared by every rerun and browser session of this app."""
+    session = requests.Session()
+    session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+    session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+    return session
+
+@st.cache_data(ttl=API_CACHE_SECONDS, show_spinner=False)
+def api_get(path, params=None):
+    """Cached GET returning the decoded JSON; errors raise and are not cached."""
+    response = get_session().get(f"{API_URL}{path}", params=params)
+    response.raise_for_status()
+    return response.json()
 
 # --- UI Views ---
 def student_view():
@@ -14,9 +34,7 @@ def student_view():
     
     # Make a GET request to the /jobs/ endpoint
     try:
-        response = requests.get(f"{API_URL}/jobs/")
-        response.raise_for_status() # Raise an exception for bad status codes
-        jobs = response.json()
+        jobs = api_get("/jobs/", {"include_description": "true"})
     except requests.exceptions.RequestException as e:
         st.error(f"Could not connect to the backend server. Please ensure it is running. Error: {e}")
         return
@@ -43,7 +61,7 @@ def student_view():
                         data = {'student_name': student_name, 'student_email': student_email}
                         
                         # Make the POST request to the /apply/{job_id} endpoint
-                        apply_response = requests.post(f"{API_URL}/apply/{job['id']}", files=files, data=data)
+                        apply_response = get_session().post(f"{API_URL}/apply/{job['id']}", files=files, data=data)
                         
                         if apply_response.status_code == 200:
                             st.success("Application submitted successfully!")
@@ -60,7 +78,7 @@ def student_view():
         if student_email_check:
             try:
                 # Make a GET request to the /student/applications/{email} endpoint
-                status_response = requests.get(f"{API_URL}/student/applications/{student_email_check}")
+                status_response = get_session().get(f"{API_URL}/student/applications/{student_email_check}")
                 status_response.raise_for_status()
                 student_apps = status_response.json()
                 
@@ -72,8 +90,10 @@ def student_view():
                     with st.container(border=True):
                         st.subheader(row['title'])
                         cols = st.columns(3)
-                        cols[0].metric("Your Final Score", f"{row['final_score']:.2f}%")
-                        cols[1].metric("AI Verdict", row['verdict'])
+                        feedback_pending = row.get('feedback_status') == 'pending'
+                        score_label = "Provisional Score" if feedback_pending else "Your Final Score"
+                        cols[0].metric(score_label, f"{row['final_score']:.2f}%")
+                        cols[1].metric("AI Verdict", "Analyzing..." if feedback_pending else row['verdict'])
                         
                         status = row['status']
                         if status == 'Shortlisted': cols[2].success(f"Status: {status} 🎉")
@@ -81,7 +101,12 @@ def student_view():
                         else: cols[2].info(f"Status: {status}")
 
                         with st.expander("💡 View Detailed Feedback"):
-                            st.markdown(row['ai_feedback'])
+                            if feedback_pending:
+                                st.info("Your AI feedback is still being generated. Check back in a minute.")
+                            elif row.get('feedback_status') == 'failed':
+                                st.warning("AI feedback could not be generated for this application.")
+                            else:
+                                st.markdown(row['ai_feedback'])
             except requests.exceptions.RequestException:
                  st.error("Could not connect to the backend server.")
         else:
@@ -110,19 +135,25 @@ def placement_team_view():
         if st.button("Post Job"):
             if job_title and job_description:
                 # Make a POST request to the /jobs/new endpoint
-                post_response = requests.post(f"{API_URL}/jobs/new", json={"title": job_title, "description": job_description})
+                post_response = get_session().post(f"{API_URL}/jobs/new", json={"title": job_title, "description": job_description})
                 if post_response.status_code == 200:
                     st.success(f"Job '{job_title}' posted successfully!")
+                    api_get.clear()
                     st.rerun()
                 else:
                     st.error("Failed to post job.")
     
     st.write("---")
     st.header("Manage Jobs & View Applications")
+    # Page cursors of every job's applications ({job_id: [None, cursor of page 2, ...]}); the
+    # whole dashboard, each job on its current page, comes from one /dashboard call
+    if 'app_pages' not in st.session_state:
+        st.session_state.app_pages = {}
+    app_pages = st.session_state.app_pages
+    params = {"limit": APPLICATIONS_PAGE_SIZE,
+              "cursor": [f"{job_id}:{cursors[-1]}" for job_id, cursors in sorted(app_pages.items()) if cursors[-1]]}
     try:
-        response = requests.get(f"{API_URL}/jobs/")
-        response.raise_for_status()
-        jobs = response.json()
+        jobs = api_get("/dashboard", params)
     except requests.exceptions.RequestException:
         st.error("Could not fetch jobs from the server.")
         return
@@ -132,34 +163,48 @@ def placement_team_view():
         return
 
     for job in jobs:
-         with st.expander(f"**{job['title']}** - View & Manage"):
+         with st.expander(f"**{job['title']}** - View & Manage ({job['application_count']} applications)"):
             if st.button("Delete This Job", key=f"delete_{job['id']}", type="primary"):
                 # Make a DELETE request to the /jobs/{job_id} endpoint
-                delete_response = requests.delete(f"{API_URL}/jobs/{job['id']}")
+                delete_response = get_session().delete(f"{API_URL}/jobs/{job['id']}")
                 if delete_response.status_code == 200:
                     st.success(f"Job '{job['title']}' deleted.")
+                    app_pages.pop(job['id'], None)
+                    api_get.clear()
                     st.rerun()
                 else:
                     st.error("Failed to delete job.")
 
-            # Get applications for this job
-            apps_response = requests.get(f"{API_URL}/jobs/{job['id']}/applications")
-            if apps_response.status_code == 200 and apps_response.json():
-                applications = apps_response.json()
-                for row in applications:
-                    with st.container(border=True, key=f"cont_{row['id']}"):
-                        # ... (Displaying candidate info, same as before)
-                        cols = st.columns([3, 1, 1, 2])
-                        cols[0].markdown(f"**{row['candidate_name']}**\n\n_{row['candidate_email']}_")
-                        cols[1].text(f"{row['final_score']:.2f}%")
-                        cols[2].text(row['verdict'])
-                        status_options = ["Applied", "Shortlisted", "Not Shortlisted"]
-                        current_status_index = status_options.index(row['status']) if row['status'] in status_options else 0
-                        new_status = cols[3].selectbox("Set Status", options=status_options, index=current_status_index, key=f"status_{row['id']}", label_visibility="collapsed")
-                        if new_status != row['status']:
-                            # Make a PUT request to update status
-                            update_response = requests.put(f"{API_URL}/applications/status", json={"application_id": row['id'], "new_status": new_status})
+            page_cursors = app_pages.setdefault(job['id'], [None])
+            applications = job['applications']
+            if applications:
+                st.caption(f"Page {len(page_cursors)}")
+                nav_cols = st.columns(2)
+                if len(page_cursors) > 1 and nav_cols[0].button("Previous", key=f"prev_{job['id']}"):
+                    page_cursors.pop()
+                    st.rerun()
+                if job.get("next_cursor") and nav_cols[1].button("Next", key=f"next_{job['id']}"):
+                    page_cursors.append(job["next_cursor"])
+                    st.rerun()
+                # Status edits are collected in a form and saved together with one batch request
+                with st.form(key=f"status_form_{job['id']}"):
+                    new_statuses = {}
+                    for row in applications:
+                        with st.container(border=True, key=f"cont_{row['id']}"):
+                            cols = st.columns([3, 1, 1, 2])
+                            cols[0].markdown(f"**{row['candidate_name']}**\n\n_{row['candidate_email']}_")
+                            cols[1].text(f"{row['final_score']:.2f}%")
+                            cols[2].text(row['verdict'])
+                            current_status_index = STATUS_OPTIONS.index(row['status']) if row['status'] in STATUS_OPTIONS else 0
+                            new_statuses[row['id']] = cols[3].selectbox("Set Status", options=STATUS_OPTIONS, index=current_status_index,
+                                                                        key=f"status_{row['id']}", label_visibility="collapsed")
+                    if st.form_submit_button("Save Status Changes"):
+                        updates = [{"application_id": row['id'], "new_status": new_statuses[row['id']]}
+                                   for row in applications if new_statuses[row['id']] != row['status']]
+                        if updates:
+                            update_response = get_session().put(f"{API_URL}/applications/status/batch", json={"updates": updates})
                             if update_response.status_code == 200:
+                                api_get.clear()
                                 st.rerun()
                             else:
                                 st.error("Failed to update status.")
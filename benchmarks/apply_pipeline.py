@@ -0,0 +1,355 @@
+"""End-to-end benchmark of the apply pipeline with offline stand-ins.
+
+Generates synthetic JDs and PDF/DOCX/TXT resumes, then
+
+1. runs applications stage by stage through the core functions (extract, keywords, embed,
+   prompt budget, LLM, score, insert) and reports latency percentiles per stage, and
+2. drives POST /apply/{job_id} in-process at several concurrency levels and reports requests/sec,
+   latency percentiles and status codes, plus how long the feedback workers take to drain the
+   LLM queue afterwards.
+
+Gemini is replaced by a deterministic fake LLM (the score is derived from the prompt, the latency
+is configurable). The database is a real Postgres given with --database-url, because the schema
+relies on SKIP LOCKED, JSONB and advisory locks; it is migrated and its tables are EMPTIED, so
+point it at a throwaway database. spaCy and the embedding backend are the configured ones.
+
+Results are written as JSON (with the git commit and settings) so runs can be compared:
+
+    python -m benchmarks.apply_pipeline --database-url postgresql://localhost/resume_bench --output bench.json
+    python -m benchmarks.apply_pipeline --database-url ... --baseline bench.json
+"""
+import argparse
+import asyncio
+import hashlib
+import io
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import docx
+import numpy as np
+from benchmarks.semantic_scoring import JOBS, FILLER, SECTIONS
+
+STAGES = ["extract", "keywords", "embed", "budget", "llm", "score", "insert"]
+FORMATS = [".pdf", ".docx", ".txt"]
+
+FAKE_FEEDBACK = """**Verdict:** {verdict}
+**Overall Score:** {score}
+**Actionable Feedback:**
+* **Strengths:** Relevant project work.
+* **Areas for Improvement:** Mention the missing keywords where they apply."""
+
+# --- Synthetic Inputs ---
+def resume_lines(rng, index, job, filler_lines):
+    """A multi-section resume for candidate `index` with the lines relevant to `job` in one section."""
+    lines = [f"Candidate {index}", f"candidate{index}@example.com"]
+    relevant_section = rng.choice(SECTIONS)
+    for heading in SECTIONS:
+        section = [rng.choice(FILLER) for _ in range(filler_lines)]
+        if heading == relevant_section:
+            section[1:1] = JOBS[job][1]
+        lines += [heading] + section + [""]
+    return lines
+
+def make_txt(lines):
+    return "\n".join(lines).encode("utf-8")
+
+def make_docx(lines):
+    document = docx.Document()
+    for line in lines:
+        document.add_paragraph(line)
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+def make_pdf(lines, lines_per_page=50):
+    """A minimal PDF (Helvetica text, no dependencies) that PyPDF2 can extract text from."""
+    def escape(text):
+        return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)] or [[]]
+    # 1: catalog, 2: page tree, 3: font, then a page object and its content stream per page
+    page_ids = [4 + 2 * i for i in range(len(pages))]
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{' '.join(f'{page_id} 0 R' for page_id in page_ids)}] /Count {len(pages)} >>",
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for page_id, page_lines in zip(page_ids, pages):
+        stream = "BT /F1 10 Tf 14 TL 50 800 Td " + " T* ".join(f"({escape(line)}) Tj" for line in page_lines) + " ET"
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Resources << /Font << /F1 3 0 R >> >> /Contents {page_id + 1} 0 R >>")
+        objects.append(f"<< /Length {len(stream.encode('latin-1'))} >>\nstream\n{stream}\nendstream")
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode("latin-1")
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    return bytes(out)
+
+MAKERS = {".pdf": make_pdf, ".docx": make_docx, ".txt": make_txt}
+
+def make_resume_files(rng, first_index, count, job, filler_lines):
+    """`count` distinct resumes for `job`, cycling through the file formats: (filename, bytes, email)."""
+    files = []
+    for index in range(first_index, first_index + count):
+        extension = FORMATS[index % len(FORMATS)]
+        lines = resume_lines(rng, index, job, filler_lines)
+        files.append((f"candidate{index}{extension}", MAKERS[extension](lines), f"candidate{index}@example.com"))
+    return files
+
+# --- Stand-ins ---
+def make_fake_llm(latency_seconds):
+    """Deterministic stand-in for the Gemini chat model: answers in the feedback format with a score
+    derived from a hash of the prompt, after `latency_seconds`. Works in the same prompt | llm |
+    parser chains, sync and async."""
+    from langchain_core.runnables import RunnableLambda
+
+    def respond(prompt):
+        score = int(hashlib.sha256(prompt.to_string().encode("utf-8")).hexdigest(), 16) % 101
+        verdict = "Good Fit" if score >= 60 else "Needs Improvement"
+        return FAKE_FEEDBACK.format(verdict=verdict, score=score)
+
+    def invoke(prompt):
+        time.sleep(latency_seconds)
+        return respond(prompt)
+
+    async def ainvoke(prompt):
+        await asyncio.sleep(latency_seconds)
+        return respond(prompt)
+
+    return RunnableLambda(invoke, afunc=ainvoke)
+
+def reset_database():
+    from core.database import transaction
+    from core.migrations import migrate
+    migrate()
+    with transaction() as cursor:
+        cursor.execute("TRUNCATE jobs, resumes, applications, feedback_jobs, llm_feedback_cache RESTART IDENTITY CASCADE")
+
+# --- Measurements ---
+def summarize(seconds):
+    """Latency percentiles in milliseconds."""
+    values = np.asarray(seconds) * 1000
+    if not len(values):
+        return {}
+    p50, p90, p99 = np.percentile(values, [50, 90, 99])
+    return {"n": len(values), "mean_ms": round(float(values.mean()), 3), "p50_ms": round(float(p50), 3),
+            "p90_ms": round(float(p90), 3), "p99_ms": round(float(p99), 3), "max_ms": round(float(values.max()), 3)}
+
+def run_stages(job_id, job, files, llm_model, backend, spool_dir):
+    """Pushes each resume through the pipeline one stage at a time and times every stage."""
+    from core.database import transaction, upsert_resumes, add_application
+    from core.embeddings import EMBEDDING_VERSION
+    from core.llm_analyzer import (encode_resumes, request_ai_feedback, parse_ai_feedback, resume_semantic_score, combine_scores,
+                                   SEMANTIC_SCORING, CHUNK_VERSION)
+    from core.pipeline import get_extraction_pool, analyze_resume
+    from core.prompt_budget import budget_feedback_inputs
+
+    timings = {stage: [] for stage in STAGES}
+    errors = Counter()
+    for filename, data, email in files:
+        path = os.path.join(spool_dir, filename)
+        with open(path, "wb") as f:
+            f.write(data)
+
+        start = time.perf_counter()
+        extraction = get_extraction_pool().extract(path, filename)
+        timings["extract"].append(time.perf_counter() - start)
+        if not extraction.ok:
+            errors[extraction.error_code] += 1
+            continue
+
+        start = time.perf_counter()
+        analysis = analyze_resume(extraction.text, job['jd_keywords'])
+        timings["keywords"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        vectors, chunk_matrices = encode_resumes([extraction.text], backend,
+                                                 chunked_texts=[extraction.text] if SEMANTIC_SCORING != 'single' else [])
+        timings["embed"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        jd_text, resume_text = budget_feedback_inputs(job['description'], extraction.text, job['jd_keywords'], job['jd_embedding'], backend)
+        timings["budget"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        raw_feedback, _ = request_ai_feedback(jd_text, resume_text, analysis['missing_keywords'], llm_model)
+        timings["llm"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        resume = {'sha256': hashlib.sha256(data).hexdigest(), 'resume_text': extraction.text, 'projects': analysis['projects'],
+                  'resume_embedding': vectors[0], 'chunk_embeddings': chunk_matrices[0] if chunk_matrices else None}
+        soft_score = resume_semantic_score(job['jd_embedding'], resume)
+        llm_score, verdict, feedback = parse_ai_feedback(raw_feedback)
+        scores = {'final': combine_scores(analysis['keyword_score'], soft_score, llm_score, job['weights']),
+                  'semantic': soft_score, 'keyword': analysis['keyword_score'], 'llm': llm_score}
+        timings["score"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        with transaction():
+            resume_id = upsert_resumes([resume], EMBEDDING_VERSION, CHUNK_VERSION)[resume['sha256']]
+            add_application(job_id, filename, email, scores, feedback, verdict, resume_id, analysis['project_mappings'], analysis['missing_keywords'])
+        timings["insert"].append(time.perf_counter() - start)
+    return {"stages": {stage: summarize(values) for stage, values in timings.items()}, "errors": dict(errors)}
+
+def count_queued_feedback():
+    """Feedback jobs still waiting or in progress; failed jobs stay in the table but never drain."""
+    from core.database import transaction
+    with transaction() as cursor:
+        cursor.execute("SELECT count(*) FROM feedback_jobs WHERE status IN ('queued', 'running')")
+        return cursor.fetchone()[0]
+
+def run_apply(client, job_id, files, concurrency, drain_timeout):
+    """Posts every file to /apply/{job_id} from `concurrency` threads and waits for the LLM queue to drain."""
+    def post(item):
+        filename, data, email = item
+        start = time.perf_counter()
+        response = client.post(f"/apply/{job_id}", data={"student_name": filename, "student_email": email},
+                               files={"resume_file": (filename, data)})
+        return time.perf_counter() - start, response.status_code
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(post, files))
+    elapsed = time.perf_counter() - start
+    statuses = Counter(status for _, status in results)
+
+    drain_start = time.perf_counter()
+    while count_queued_feedback() and time.perf_counter() - drain_start < drain_timeout:
+        time.sleep(0.05)
+    return {
+        "concurrency": concurrency,
+        "requests": len(results),
+        "requests_per_second": round(statuses[200] / elapsed, 2) if elapsed else None,
+        "latency": summarize([seconds for seconds, status in results if status == 200]),
+        "status_codes": {str(code): n for code, n in sorted(statuses.items())},
+        "feedback_drain_seconds": round(time.perf_counter() - drain_start, 3),
+        "feedback_left_queued": count_queued_feedback(),
+    }
+
+def peak_rss_mb(who):
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    rss = resource.getrusage(who).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def git_commit():
+    try:
+        result = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=False)
+    except OSError:
+        return None
+    return result.stdout.strip() or None
+
+# --- Comparison ---
+def flatten(report, prefix=""):
+    """Numeric leaves of a report keyed by their path, e.g. 'stages.embed.p50_ms'."""
+    values = {}
+    for key, value in report.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            values.update(flatten(value, path + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            values[path] = value
+    return values
+
+def compare(report, baseline):
+    """Lines describing how each shared metric changed against a baseline report."""
+    current, previous = flatten(report["results"]), flatten(baseline["results"])
+    lines = [f"Baseline {baseline['meta'].get('commit')} -> current {report['meta'].get('commit')}"]
+    for path in sorted(current.keys() & previous.keys()):
+        old, new = previous[path], current[path]
+        change = f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+        lines.append(f"{path}: {old} -> {new} ({change})")
+    return lines
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the apply pipeline end to end with a fake LLM.")
+    parser.add_argument("--database-url", default=os.environ.get("BENCHMARK_DATABASE_URL"),
+                        help="throwaway Postgres database; its tables are emptied (default: $BENCHMARK_DATABASE_URL)")
+    parser.add_argument("--stage-resumes", type=int, default=60, help="resumes timed stage by stage")
+    parser.add_argument("--requests", type=int, default=60, help="/apply requests per concurrency level")
+    parser.add_argument("--concurrency", default="1,4,16", help="comma-separated concurrency levels")
+    parser.add_argument("--filler-lines", type=int, default=8, help="filler lines per resume section")
+    parser.add_argument("--llm-latency-ms", type=float, default=200.0)
+    parser.add_argument("--drain-timeout", type=float, default=120.0, help="seconds to wait for the feedback queue per level")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--baseline", help="earlier JSON report to compare against")
+    args = parser.parse_args()
+    if not args.database_url:
+        parser.error("--database-url (or BENCHMARK_DATABASE_URL) is required; the benchmark empties that database.")
+    concurrency_levels = [int(level) for level in args.concurrency.split(",")]
+
+    # Settings are read from the environment, so they must be in place before the app is imported
+    index_dir = tempfile.mkdtemp(prefix="bench-index-")
+    os.environ.update({"DATABASE_URL": args.database_url, "CANDIDATE_INDEX_DIR": index_dir,
+                       "AUTO_MIGRATE": "true", "MODEL_WARMUP": "false", "FEEDBACK_WORKERS_IN_API": "true"})
+    from fastapi.testclient import TestClient
+    import main as api
+    from core.embeddings import EMBEDDING_VERSION
+    from core.llm_analyzer import SEMANTIC_SCORING
+    from core.pipeline import shutdown_pools
+
+    rng = random.Random(args.seed)
+    reset_database()
+    fake_llm = make_fake_llm(args.llm_latency_ms / 1000)
+    api.llm.loader = lambda: fake_llm
+    load_start = time.perf_counter()
+    nlp, backend = api.nlp.get(), api.semantic_model.get()
+    model_load_seconds = time.perf_counter() - load_start
+
+    results = {"model_load_seconds": round(model_load_seconds, 3)}
+    with TestClient(api.app) as client, tempfile.TemporaryDirectory(prefix="bench-") as spool_dir:
+        job_ids = {job: client.post("/jobs/new", json={"title": job, "description": JOBS[job][0]}).json()["job_id"] for job in JOBS}
+        stage_job = rng.choice(list(JOBS))
+        stage_files = make_resume_files(rng, 0, args.stage_resumes, stage_job, args.filler_lines)
+        results.update(run_stages(job_ids[stage_job], api.load_job_analysis(job_ids[stage_job]), stage_files, fake_llm, backend, spool_dir))
+
+        results["apply"] = []
+        first_index = args.stage_resumes
+        for concurrency in concurrency_levels:
+            job = rng.choice(list(JOBS))
+            files = make_resume_files(rng, first_index, args.requests, job, args.filler_lines)
+            first_index += args.requests
+            results["apply"].append(run_apply(client, job_ids[job], files, concurrency, args.drain_timeout))
+    shutdown_pools()
+    # Extraction and process-pool workers count once they have exited
+    results["peak_rss_mb"] = {"api_process": peak_rss_mb(resource.RUSAGE_SELF), "worker_processes": peak_rss_mb(resource.RUSAGE_CHILDREN)}
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "embedding_version": EMBEDDING_VERSION,
+            "semantic_scoring": SEMANTIC_SCORING,
+            "spacy_pipeline": list(getattr(nlp, "pipe_names", [])),
+            "args": {key: value for key, value in vars(args).items() if key not in ("database_url", "output", "baseline")},
+        },
+        # The apply levels are keyed by concurrency so reports can be compared level by level
+        "results": {**results, "apply": {f"c{level['concurrency']}": level for level in results["apply"]}},
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    if args.baseline:
+        with open(args.baseline) as f:
+            print("\n".join(compare(report, json.load(f))), file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Latency of /search/applications query shapes over a large synthetic applicant pool.
+
+Seeds a throwaway Postgres database with --applications applications spread over --jobs jobs and
+--resumes distinct resumes (built from the benchmark JDs' skills and filler lines, so some terms
+are rare and some appear in most resumes), then times core.database.search_applications for
+full-text queries, skill filters, score ranges and job filters, alone and combined, following
+next_cursor for a few pages. The database is migrated and its tables are EMPTIED.
+
+    python -m benchmarks.search_applications --database-url postgresql://localhost/resume_bench --applications 300000
+"""
+import argparse
+import json
+import os
+import random
+import time
+from datetime import datetime, timezone
+from benchmarks.semantic_scoring import JOBS, FILLER, SECTIONS
+from benchmarks.apply_pipeline import summarize, git_commit
+
+# Extra skills of varying rarity, so filters range from very to barely selective
+SKILLS = ["Python", "SQL", "Java", "Docker", "Kubernetes", "AWS", "React", "TypeScript", "C++", "Go", "Rust", "Excel",
+          "Tableau", "Spark", "Kafka", "Terraform", "GraphQL", "Node.js", "Django", "Flask", "PyTorch", "Figma"]
+QUERIES = {
+    "text_common": {"query": "experience"},
+    "text_rare": {"query": "kafka terraform"},
+    "text_mid": {"query": "gradient boosting"},
+    "text_phrase": {"query": '"gradient boosting" -java'},
+    "skills": {"skills": ["python", "docker"]},
+    "skills_rare": {"skills": ["rust", "graphql"]},
+    "score_range": {"min_score": 80, "max_score": 90},
+    "jobs_score": {"job_ids": [1, 2, 3], "min_score": 60},
+    "combined": {"query": "postgresql", "skills": ["python"], "min_score": 50, "job_ids": list(range(1, 21))},
+    "everything": {},
+}
+
+def make_resume(rng, index):
+    sections = []
+    for heading in SECTIONS:
+        lines = [rng.choice(FILLER) for _ in range(4)]
+        if heading == "EXPERIENCE":
+            lines += rng.sample(JOBS[rng.choice(list(JOBS))][1], 2)
+        sections.append(f"{heading}\n" + "\n".join(lines))
+    # Skill k of the list appears in roughly 1/(k+2) of the resumes
+    skills = [skill for k, skill in enumerate(SKILLS) if rng.random() < 1 / (k + 2)]
+    return f"Candidate {index}\nSKILLS\n{', '.join(skills)}\n" + "\n".join(sections)
+
+def seed(cursor, rng, applications, resumes, jobs):
+    import psycopg2.extras
+    from core.keyword_matcher import skill_terms
+    cursor.execute("TRUNCATE jobs, resumes, applications, feedback_jobs, llm_feedback_cache RESTART IDENTITY CASCADE")
+    now = datetime.now(timezone.utc)
+    psycopg2.extras.execute_values(cursor, "INSERT INTO jobs (timestamp, title, description) VALUES %s",
+                                   [(now, f"Job {j}", JOBS[list(JOBS)[j % len(JOBS)]][0]) for j in range(jobs)])
+    texts = [make_resume(rng, i) for i in range(resumes)]
+    psycopg2.extras.execute_values(cursor, "INSERT INTO resumes (sha256, resume_text, skills) VALUES %s",
+                                   [(f"bench:{i}", text, skill_terms(text)) for i, text in enumerate(texts)],
+                                   template="(%s, %s, %s::text[])", page_size=2000)
+    rows = [(rng.randint(1, jobs), now, f"Candidate {i}", f"c{i}@example.com", min(100.0, max(0.0, rng.gauss(55, 18))),
+             rng.choice(["Applied", "Applied", "Shortlisted", "Not Shortlisted"]), rng.randint(1, resumes)) for i in range(applications)]
+    psycopg2.extras.execute_values(cursor, """
+        INSERT INTO applications (job_id, timestamp, candidate_name, candidate_email, final_score, status, resume_id) VALUES %s
+    """, rows, page_size=5000)
+    cursor.execute("ANALYZE")
+
+def time_query(search, filters, repeats, pages, limit):
+    first_page, next_pages, total = [], [], 0
+    for _ in range(repeats):
+        after = None
+        for page in range(pages):
+            start = time.perf_counter()
+            rows, after, _ = search(**filters, limit=limit, after=after)
+            (first_page if page == 0 else next_pages).append(time.perf_counter() - start)
+            total = max(total, len(rows))
+            if after is None:
+                break
+    return {"first_page": summarize(first_page), "next_pages": summarize(next_pages), "page_rows": total}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--database-url", default=os.environ.get("BENCHMARK_DATABASE_URL"),
+                        help="throwaway Postgres database; its tables are emptied (default: $BENCHMARK_DATABASE_URL)")
+    parser.add_argument("--applications", type=int, default=300_000)
+    parser.add_argument("--resumes", type=int, default=100_000, help="distinct resumes the applications are made with")
+    parser.add_argument("--jobs", type=int, default=200)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=3, help="pages followed per repeat")
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--skip-seed", action="store_true", help="reuse the data seeded by a previous run")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    if not args.database_url:
+        parser.error("--database-url (or BENCHMARK_DATABASE_URL) is required; the benchmark empties that database.")
+
+    os.environ["DATABASE_URL"] = args.database_url
+    from core.database import transaction, search_applications
+    from core.migrations import migrate
+    migrate()
+    if not args.skip_seed:
+        start = time.perf_counter()
+        with transaction() as cursor:
+            seed(cursor, random.Random(args.seed), args.applications, args.resumes, args.jobs)
+        print(f"Seeded {args.applications} applications in {time.perf_counter() - start:.1f}s")
+    results = {name: time_query(search_applications, filters, args.repeats, args.pages, args.limit) for name, filters in QUERIES.items()}
+    report = {"meta": {"commit": git_commit(), "applications": args.applications, "resumes": args.resumes, "jobs": args.jobs,
+                       "limit": args.limit}, "results": results}
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+import json
+import os
+import threading
+import numpy as np
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None
+
+class CandidateIndex:
+    """Memory-mapped, file-locked matrix of normalized resume embeddings for cross-job candidate search."""
+
+    # Bumped when the meaning of the stored ids changes (2: resume ids instead of application ids)
+    FORMAT_VERSION = 2
+
+    def __init__(self, directory, model_name, source):
+        """`source()` yields (ids, vectors) batches of every stored resume, for (re)building the index."""
+        self.directory = directory
+        self.model_name = model_name
+        self.source = source
+        self.dim = None
+        self._loaded = False
+        self._ids = np.empty(0, dtype=np.int64)
+        self._vectors = np.empty((0, 0), dtype=np.float32)
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+
+    @property
+    def _vectors_path(self):
+        return os.path.join(self.directory, "vectors.f32")
+
+    @property
+    def _ids_path(self):
+        return os.path.join(self.directory, "ids.i64")
+
+    @property
+    def _meta_path(self):
+        return os.path.join(self.directory, "meta.json")
+
+    def __len__(self):
+        return len(self._ids)
+
+    @contextmanager
+    def _file_lock(self):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, ".lock"), "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def load(self):
+        """Maps the on-disk index. Returns False if it is missing, was built with another model or
+        is in an older format, in which case it must be rebuilt."""
+        try:
+            with open(self._meta_path) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if meta.get("model_name") != self.model_name or meta.get("format") != self.FORMAT_VERSION:
+            return False
+        self.dim = meta["dim"]
+        self.refresh()
+        return True
+
+    def ensure_loaded(self):
+        """Maps the index on first use, rebuilding it from `source` if it is missing or stale.
+        Returns True if this call built it."""
+        if self._loaded:
+            return False
+        with self._load_lock:
+            if self._loaded:
+                return False
+            built = False
+            # Under the file lock, so concurrent workers find the index the first one built
+            with self._file_lock():
+                if not self.load():
+                    print("Building candidate index from stored resume embeddings...")
+                    self._write(self.source())
+                    built = True
+            self.refresh()
+            self._loaded = True
+            return built
+
+    def refresh(self):
+        """Remaps the files if rows were appended (by this or another process) since the last map."""
+        if self.dim is None:
+            return
+        with self._lock:
+            try:
+                rows = min(os.path.getsize(self._ids_path) // 8, os.path.getsize(self._vectors_path) // (4 * self.dim))
+            except OSError:
+                rows = 0
+            if rows == len(self._ids):
+                return
+            if rows == 0:
+                self._ids = np.empty(0, dtype=np.int64)
+                self._vectors = np.empty((0, self.dim), dtype=np.float32)
+                return
+            self._ids = np.memmap(self._ids_path, dtype=np.int64, mode="r", shape=(rows,))
+            self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(rows, self.dim))
+
+    def rebuild(self, batches):
+        """Rewrites the index from an iterable of (ids, vectors) batches, e.g. streamed from the database."""
+        with self._file_lock():
+            self._write(batches)
+        self.refresh()
+
+    def _write(self, batches):
+        """Replaces the index files; the caller holds the file lock."""
+        tmp_ids, tmp_vectors = self._ids_path + ".tmp", self._vectors_path + ".tmp"
+        dim = None
+        with open(tmp_ids, "wb") as ids_file, open(tmp_vectors, "wb") as vectors_file:
+            for ids, vectors in batches:
+                vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+                dim = vectors.shape[1]
+                vectors_file.write(vectors.tobytes())
+                ids_file.write(np.asarray(ids, dtype=np.int64).tobytes())
+        with self._lock:
+            # Drop the old maps before their files are replaced
+            self._ids = np.empty(0, dtype=np.int64)
+            self._vectors = np.empty((0, dim or 0), dtype=np.float32)
+            os.replace(tmp_vectors, self._vectors_path)
+            os.replace(tmp_ids, self._ids_path)
+            self._write_meta(dim)
+
+    def _write_meta(self, dim):
+        self.dim = dim
+        with open(self._meta_path, "w") as f:
+            json.dump({"model_name": self.model_name, "dim": dim, "format": self.FORMAT_VERSION}, f)
+
+    def add(self, ids, vectors):
+        """Appends rows for newly stored resumes."""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(len(ids), -1)
+        if not len(ids):
+            return
+        if self.ensure_loaded():
+            # The build read the database, which may already hold these resumes
+            keep = ~np.isin(np.asarray(ids, dtype=np.int64), self._ids)
+            ids, vectors = np.asarray(ids, dtype=np.int64)[keep], vectors[keep]
+            if not len(ids):
+                return
+        with self._file_lock():
+            if self.dim is None:
+                # The index has no rows yet; another worker may have added the first ones since it was loaded
+                self.load()
+            if self.dim is None:
+                self._write_meta(vectors.shape[1])
+            # Vectors first: readers only map rows present in both files
+            with open(self._vectors_path, "ab") as vectors_file:
+                vectors_file.write(vectors.tobytes())
+            with open(self._ids_path, "ab") as ids_file:
+                ids_file.write(np.asarray(ids, dtype=np.int64).tobytes())
+        self.refresh()
+
+    def search(self, query, k):
+        """Returns up to k (id, cosine similarity) pairs, best first."""
+        self.ensure_loaded()
+        self.refresh()
+        with self._lock:
+            ids, vectors = self._ids, self._vectors
+        if len(ids) == 0 or k <= 0:
+            return []
+        query = np.asarray(query, dtype=np.float32)
+        scores = vectors @ (query / (np.linalg.norm(query) or 1.0))
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(ids[i]), float(scores[i])) for i in top]
@@ -0,0 +1,37 @@
+import os
+import threading
+import tomllib
+
+# Same files Streamlit reads st.secrets from; the project file overrides the user-wide one
+SECRETS_PATHS = (os.path.join(os.path.expanduser("~"), ".streamlit", "secrets.toml"),
+                 os.path.join(os.getcwd(), ".streamlit", "secrets.toml"))
+
+_secrets = None
+_secrets_lock = threading.Lock()
+
+def _load_secrets():
+    """Reads the Streamlit secrets files directly, so the API doesn't need to import streamlit."""
+    global _secrets
+    with _secrets_lock:
+        if _secrets is None:
+            secrets = {}
+            for path in SECRETS_PATHS:
+                try:
+                    with open(path, "rb") as f:
+                        secrets.update(tomllib.load(f))
+                except FileNotFoundError:
+                    continue
+            _secrets = secrets
+    return _secrets
+
+def get_setting(name, default=None):
+    """Reads a setting from the environment (converted to the type of `default`), then the Streamlit
+    secrets file, falling back to `default`."""
+    if name in os.environ:
+        value = os.environ[name]
+        if isinstance(default, bool):
+            return value.strip().lower() in ("1", "true", "yes", "on")
+        if default is not None:
+            return type(default)(value)
+        return value
+    return _load_secrets().get(name, default)
@@ -1,128 +1,749 @@
 import psycopg2
-import pandas as pd
+import psycopg2.pool
+import psycopg2.extras
+import psycopg2.extensions
+import numpy as np
+import threading
+import contextvars
+import time
+from contextlib import contextmanager
 from datetime import datetime
-import streamlit as st
-
-def get_db_connection():
-    """Establishes and returns a connection to the PostgreSQL database."""
-    return psycopg2.connect(st.secrets["DATABASE_URL"])
-
-def init_db():
-    """Initializes the database and creates tables if they don't exist."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    # Use SERIAL PRIMARY KEY for auto-incrementing in PostgreSQL
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS jobs (
-            id SERIAL PRIMARY KEY,
-            timestamp TIMESTAMPTZ NOT NULL,
-            title TEXT NOT NULL,
-            description TEXT NOT NULL
-        )
-    """)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS applications (
-            id SERIAL PRIMARY KEY,
-            job_id INTEGER NOT NULL,
-            timestamp TIMESTAMPTZ NOT NULL,
-            candidate_name TEXT NOT NULL,
-            candidate_email TEXT NOT NULL,
-            final_score REAL,
-            semantic_score REAL,
-            keyword_score REAL,
-            llm_score REAL,
-            ai_feedback TEXT,
-            verdict TEXT, 
-            status TEXT DEFAULT 'Applied',
-            projects TEXT,
-            project_mappings TEXT,
-            missing_keywords TEXT,
-            FOREIGN KEY (job_id) REFERENCES jobs (id) ON DELETE CASCADE,
-            UNIQUE(job_id, candidate_email)
-        )
-    """)
-    conn.commit()
-    cursor.close()
-    conn.close()
-
-def add_job(title, description):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    # Use %s for placeholders in psycopg2
-    cursor.execute("INSERT INTO jobs (timestamp, title, description) VALUES (%s, %s, %s)",
-                   (datetime.now(), title, description))
-    conn.commit()
-    cursor.close()
-    conn.close()
+from core.config import get_setting
+from core.metrics import observe_query, observe_pool_wait
+from core.keyword_matcher import skill_terms
 
-def delete_job(job_id):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM jobs WHERE id = %s", (job_id,))
-    conn.commit()
-    cursor.close()
-    conn.close()
-
-def get_all_jobs():
-    conn = get_db_connection()
-    df = pd.read_sql_query("SELECT id, title, description FROM jobs ORDER BY timestamp DESC", conn)
-    conn.close()
-    return df
-
-def add_application(job_id, candidate_name, candidate_email, scores, feedback, verdict, projects, project_mappings, missing_keywords):
-    conn = get_db_connection()
-    cursor = conn.cursor()
+# --- Connection Pool ---
+_pool = None
+_pool_slots = None
+_pool_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_pool_stats = {'checkouts': 0, 'timeouts': 0, 'in_use': 0, 'wait_seconds_total': 0.0, 'wait_seconds_max': 0.0}
+# The connection of the transaction currently open in this thread/task, so nested helpers join it
+_current_conn = contextvars.ContextVar('current_conn', default=None)
+
+class TimedCursor(psycopg2.extensions.cursor):
+    """Cursor that reports every statement's duration to core.metrics (by verb and table)."""
+
+    def execute(self, query, vars=None):
+        start = time.perf_counter()
+        failed = True
+        try:
+            result = super().execute(query, vars)
+            failed = False
+            return result
+        finally:
+            observe_query(query, time.perf_counter() - start, failed)
+
+def _get_pool():
+    """Creates the process-wide connection pool on first use, sized from DB_POOL_MIN/DB_POOL_MAX."""
+    global _pool, _pool_slots
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                maxconn = get_setting("DB_POOL_MAX", 10)
+                minconn = min(get_setting("DB_POOL_MIN", 1), maxconn)
+                _pool_slots = threading.BoundedSemaphore(maxconn)
+                _pool = psycopg2.pool.ThreadedConnectionPool(minconn, maxconn, get_setting("DATABASE_URL"), cursor_factory=TimedCursor)
+    return _pool
+
+@contextmanager
+def _checkout():
+    """Borrows a connection from the pool, waiting up to DB_POOL_TIMEOUT seconds for a free one."""
+    pool = _get_pool()
+    start = time.perf_counter()
+    # ThreadedConnectionPool raises instead of blocking when exhausted, so gate it with a semaphore
+    acquired = _pool_slots.acquire(timeout=get_setting("DB_POOL_TIMEOUT", 30.0))
+    waited = time.perf_counter() - start
+    observe_pool_wait(waited)
+    with _stats_lock:
+        if not acquired:
+            _pool_stats['timeouts'] += 1
+        else:
+            _pool_stats['checkouts'] += 1
+            _pool_stats['in_use'] += 1
+            _pool_stats['wait_seconds_total'] += waited
+            _pool_stats['wait_seconds_max'] = max(_pool_stats['wait_seconds_max'], waited)
+    if not acquired:
+        raise psycopg2.pool.PoolError(f"Timed out after {waited:.1f}s waiting for a database connection")
     try:
-        cursor.execute("""
-            INSERT INTO applications (job_id, timestamp, candidate_name, candidate_email, final_score, semantic_score, keyword_score, llm_score, ai_feedback, verdict, projects, project_mappings, missing_keywords)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """, (job_id, datetime.now(), candidate_name, candidate_email, scores['final'], scores['semantic'], scores['keyword'], scores['llm'], feedback, verdict, str(projects), str(project_mappings), ", ".join(missing_keywords)))
-        conn.commit()
-        return True
-    except psycopg2.IntegrityError:
-        conn.rollback() # Rollback the transaction on error
-        return False
+        conn = pool.getconn()
+        try:
+            yield conn
+        finally:
+            pool.putconn(conn, close=bool(conn.closed))
     finally:
-        cursor.close()
-        conn.close()
-
-def get_applications_for_job(job_id):
-    conn = get_db_connection()
-    df = pd.read_sql_query(
-        "SELECT id, candidate_name, candidate_email, final_score, verdict, status, missing_keywords FROM applications WHERE job_id = %(job_id)s ORDER BY final_score DESC",
-        conn,
-        params={'job_id': job_id}
-    )
-    conn.close()
-    return df
+        with _stats_lock:
+            _pool_stats['in_use'] -= 1
+        _pool_slots.release()
+
+@contextmanager
+def transaction():
+    """Yields a cursor in a transaction; nested blocks reuse the outer one and only the outermost commits."""
+    conn = _current_conn.get()
+    if conn is not None:
+        with conn.cursor() as cursor:
+            yield cursor
+        return
+    with _checkout() as conn:
+        token = _current_conn.set(conn)
+        try:
+            with conn.cursor() as cursor:
+                yield cursor
+            conn.commit()
+        except BaseException:
+            if not conn.closed:
+                conn.rollback()
+            raise
+        finally:
+            _current_conn.reset(token)
+
+def get_pool_stats():
+    """Checkout counts and wait times of the connection pool since process start."""
+    with _stats_lock:
+        stats = dict(_pool_stats)
+    stats['wait_seconds_avg'] = stats['wait_seconds_total'] / stats['checkouts'] if stats['checkouts'] else 0.0
+    stats['max_connections'] = _pool.maxconn if _pool is not None else get_setting("DB_POOL_MAX", 10)
+    return stats
+
+def embedding_to_bytes(embedding):
+    """Serializes an embedding vector as raw float32 bytes for a BYTEA column."""
+    return psycopg2.Binary(np.asarray(embedding, dtype=np.float32).tobytes())
+
+def bytes_to_embedding(data):
+    """Inverse of embedding_to_bytes; returns None for a NULL column."""
+    if data is None:
+        return None
+    return np.frombuffer(bytes(data), dtype=np.float32).copy()
+
+def bytes_to_chunk_embeddings(data, chunk_count):
+    """Reads back a (chunk_count, dim) matrix stored with embedding_to_bytes; None for a NULL column."""
+    if data is None or not chunk_count:
+        return None
+    return bytes_to_embedding(data).reshape(chunk_count, -1)
+
+def add_job(title, description, jd_keywords, jd_embedding, analysis_version):
+    with transaction() as cursor:
+        # Use %s for placeholders in psycopg2
+        cursor.execute("""
+            INSERT INTO jobs (timestamp, title, description, jd_keywords, jd_embedding, analysis_version)
+            VALUES (%s, %s, %s, %s, %s, %s) RETURNING id
+        """, (datetime.now(), title, description, list(jd_keywords), embedding_to_bytes(jd_embedding), analysis_version))
+        return cursor.fetchone()[0]
+
+def get_job_analysis(job_id):
+    """Returns the description, stored JD analysis and score weights of a job in one query, or None if it doesn't exist."""
+    with transaction() as cursor:
+        cursor.execute("""
+            SELECT description, jd_keywords, jd_embedding, analysis_version, weight_keyword, weight_semantic, weight_llm
+            FROM jobs WHERE id = %s
+        """, (job_id,))
+        row = cursor.fetchone()
+    if row is None:
+        return None
+    return {
+        'description': row[0],
+        'jd_keywords': row[1] or [],
+        'jd_embedding': bytes_to_embedding(row[2]),
+        'analysis_version': row[3],
+        'weights': {'keyword': row[4], 'semantic': row[5], 'llm': row[6]},
+    }
+
+def update_job_analysis(job_id, jd_keywords, jd_embedding, analysis_version):
+    with transaction() as cursor:
+        cursor.execute("UPDATE jobs SET jd_keywords = %s, jd_embedding = %s, analysis_version = %s WHERE id = %s",
+                       (list(jd_keywords), embedding_to_bytes(jd_embedding), analysis_version, job_id))
+
+def update_job_analyses(rows, analysis_version):
+    """update_job_analysis for many (job_id, jd_keywords, jd_embedding) rows with one statement."""
+    if not rows:
+        return
+    with transaction() as cursor:
+        psycopg2.extras.execute_values(cursor, """
+            UPDATE jobs AS j SET jd_keywords = v.jd_keywords, jd_embedding = v.jd_embedding, analysis_version = v.analysis_version
+            FROM (VALUES %s) AS v (id, jd_keywords, jd_embedding, analysis_version)
+            WHERE j.id = v.id
+        """, [(job_id, list(jd_keywords), embedding_to_bytes(jd_embedding), analysis_version) for job_id, jd_keywords, jd_embedding in rows],
+            template="(%s::int, %s::text[], %s::bytea, %s::text)")
+
+def update_job_description(job_id, description, jd_keywords, jd_embedding, analysis_version):
+    with transaction() as cursor:
+        cursor.execute("""
+            UPDATE jobs SET description = %s, jd_keywords = %s, jd_embedding = %s, analysis_version = %s WHERE id = %s
+        """, (description, list(jd_keywords), embedding_to_bytes(jd_embedding), analysis_version, job_id))
+
+def update_job_weights(job_id, weights):
+    with transaction() as cursor:
+        cursor.execute("UPDATE jobs SET weight_keyword = %s, weight_semantic = %s, weight_llm = %s WHERE id = %s",
+                       (weights['keyword'], weights['semantic'], weights['llm'], job_id))
+
+def get_stale_jobs(analysis_version):
+    """(id, description) of jobs whose stored analysis was produced by a different extractor/model version."""
+    with transaction() as cursor:
+        cursor.execute("SELECT id, description FROM jobs WHERE analysis_version IS DISTINCT FROM %s ORDER BY id", (analysis_version,))
+        return cursor.fetchall()
+
+def delete_job(job_id):
+    with transaction() as cursor:
+        cursor.execute("DELETE FROM jobs WHERE id = %s", (job_id,))
+
+def _rows_as_dicts(cursor):
+    """Yields the remaining rows of an executed cursor as dicts keyed by column name."""
+    columns = [column[0] for column in cursor.description]
+    for row in cursor:
+        yield dict(zip(columns, row))
+
+def get_all_jobs(include_description=False):
+    """Job list for listing views; the (potentially long) description is only included on request."""
+    columns = "id, title, timestamp, description" if include_description else "id, title, timestamp"
+    with transaction() as cursor:
+        cursor.execute(f"SELECT {columns} FROM jobs ORDER BY timestamp DESC, id DESC")
+        return list(_rows_as_dicts(cursor))
+
+# --- Resumes ---
+def get_resumes_by_hash(hashes, embedding_model, chunk_version=None):
+    """Stored resumes for the given upload hashes, keyed by hash. A resume's embedding is returned as
+    None if it was computed by a different model than `embedding_model`, and its chunk embeddings
+    as None unless they were computed with `chunk_version`."""
+    with transaction() as cursor:
+        cursor.execute("""
+            SELECT sha256, id, resume_text, projects, resume_embedding, embedding_model, chunk_embeddings, chunk_count, chunk_version
+            FROM resumes WHERE sha256 = ANY(%s)
+        """, (list(hashes),))
+        return {row[0]: {
+            'id': row[1],
+            'resume_text': row[2],
+            'projects': row[3],
+            'resume_embedding': bytes_to_embedding(row[4]) if row[5] == embedding_model else None,
+            'chunk_embeddings': bytes_to_chunk_embeddings(row[6], row[7]) if chunk_version is not None and row[8] == chunk_version else None,
+        } for row in cursor.fetchall()}
+
+def upsert_resumes(resumes, embedding_model, chunk_version=None):
+    """Stores parsed resume dicts and returns {sha256: resume_id}; an already stored hash keeps its text
+    and takes the new embeddings."""
+    rows = {}
+    for r in resumes:
+        chunks = r.get('chunk_embeddings')
+        rows[r['sha256']] = (r['sha256'], r['resume_text'], psycopg2.extras.Json(r['projects']), embedding_to_bytes(r['resume_embedding']), embedding_model,
+                             embedding_to_bytes(chunks) if chunks is not None else None, len(chunks) if chunks is not None else None,
+                             chunk_version if chunks is not None else None, skill_terms(r['resume_text']))
+    if not rows:
+        return {}
+    with transaction() as cursor:
+        inserted = psycopg2.extras.execute_values(cursor, """
+            INSERT INTO resumes (sha256, resume_text, projects, resume_embedding, embedding_model, chunk_embeddings, chunk_count, chunk_version, skills) VALUES %s
+            ON CONFLICT (sha256) DO UPDATE SET resume_embedding = EXCLUDED.resume_embedding, embedding_model = EXCLUDED.embedding_model,
+                chunk_embeddings = COALESCE(EXCLUDED.chunk_embeddings, resumes.chunk_embeddings),
+                chunk_count = COALESCE(EXCLUDED.chunk_count, resumes.chunk_count),
+                chunk_version = COALESCE(EXCLUDED.chunk_version, resumes.chunk_version)
+            RETURNING sha256, id
+        """, list(rows.values()), page_size=500, fetch=True)
+        return dict(inserted)
+
+def update_resume_embeddings(rows, embedding_model):
+    """Stores recomputed embeddings for (resume_id, embedding) pairs, e.g. resumes embedded by an older model."""
+    if not rows:
+        return
+    with transaction() as cursor:
+        psycopg2.extras.execute_values(cursor, """
+            UPDATE resumes AS r SET resume_embedding = v.resume_embedding, embedding_model = v.embedding_model
+            FROM (VALUES %s) AS v (id, resume_embedding, embedding_model)
+            WHERE r.id = v.id
+        """, [(resume_id, embedding_to_bytes(embedding), embedding_model) for resume_id, embedding in rows],
+            template="(%s::int, %s::bytea, %s::text)", page_size=1000)
+
+def update_resume_chunk_embeddings(rows, chunk_version):
+    """Stores computed chunk embeddings for (resume_id, chunk_matrix) pairs."""
+    if not rows:
+        return
+    with transaction() as cursor:
+        psycopg2.extras.execute_values(cursor, """
+            UPDATE resumes AS r SET chunk_embeddings = v.chunk_embeddings, chunk_count = v.chunk_count, chunk_version = v.chunk_version
+            FROM (VALUES %s) AS v (id, chunk_embeddings, chunk_count, chunk_version)
+            WHERE r.id = v.id
+        """, [(resume_id, embedding_to_bytes(chunks), len(chunks), chunk_version) for resume_id, chunks in rows],
+            template="(%s::int, %s::bytea, %s::int, %s::text)", page_size=1000)
+
+def iter_resume_embeddings(embedding_model, batch_size=5000):
+    """Streams (resume_ids, embedding_matrix) batches for rebuilding the candidate index,
+    using a server-side cursor so the whole table is never held in memory."""
+    with transaction() as cursor:
+        with cursor.connection.cursor(name="resume_embeddings") as stream:
+            stream.itersize = batch_size
+            stream.execute("SELECT id, resume_embedding FROM resumes WHERE resume_embedding IS NOT NULL AND embedding_model = %s ORDER BY id",
+                           (embedding_model,))
+            while True:
+                rows = stream.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield [row[0] for row in rows], np.stack([bytes_to_embedding(row[1]) for row in rows])
+
+def get_candidates_for_resumes(resume_ids):
+    """The most recent application made with each of the given resumes, keyed by resume id."""
+    with transaction() as cursor:
+        cursor.execute("""
+            SELECT DISTINCT ON (a.resume_id) a.resume_id, a.id, a.candidate_name, a.candidate_email, a.job_id, j.title
+            FROM applications a JOIN jobs j ON a.job_id = j.id
+            WHERE a.resume_id = ANY(%s)
+            ORDER BY a.resume_id, a.id DESC
+        """, (list(resume_ids),))
+        return {row[0]: {'application_id': row[1], 'candidate_name': row[2], 'candidate_email': row[3], 'job_id': row[4], 'job_title': row[5]}
+                for row in cursor.fetchall()}
+
+# --- Applications ---
+def add_application(job_id, candidate_name, candidate_email, scores, feedback, verdict, resume_id, project_mappings, missing_keywords, feedback_status='complete'):
+    """Inserts an application and returns its id, or None if the candidate already applied to this job."""
+    with transaction() as cursor:
+        # ON CONFLICT instead of catching IntegrityError so a duplicate doesn't abort an enclosing transaction
+        cursor.execute("""
+            INSERT INTO applications (job_id, timestamp, candidate_name, candidate_email, final_score, semantic_score, keyword_score, llm_score, ai_feedback, verdict, resume_id, project_mappings, missing_keywords, feedback_status)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            ON CONFLICT (job_id, candidate_email) DO NOTHING
+            RETURNING id
+        """, (job_id, datetime.now(), candidate_name, candidate_email, scores['final'], scores['semantic'], scores['keyword'], scores['llm'], feedback, verdict,
+              resume_id, psycopg2.extras.Json(project_mappings), list(missing_keywords), feedback_status))
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+def add_applications_bulk(job_id, applications):
+    """Inserts many pending applications in one statement and queues their LLM feedback.
+    Returns {candidate_email: application_id} for the rows actually inserted."""
+    if not applications:
+        return {}
+    now = datetime.now()
+    rows = [(job_id, now, a['candidate_name'], a['candidate_email'], a['scores']['final'], a['scores']['semantic'], a['scores']['keyword'],
+             None, None, "Pending", a['resume_id'], psycopg2.extras.Json(a['project_mappings']), list(a['missing_keywords']), 'pending')
+            for a in applications]
+    with transaction() as cursor:
+        inserted = psycopg2.extras.execute_values(cursor, """
+            INSERT INTO applications (job_id, timestamp, candidate_name, candidate_email, final_score, semantic_score, keyword_score, llm_score, ai_feedback, verdict, resume_id, project_mappings, missing_keywords, feedback_status)
+            VALUES %s
+            ON CONFLICT (job_id, candidate_email) DO NOTHING
+            RETURNING candidate_email, id
+        """, rows, template="(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s::text[], %s)", page_size=500, fetch=True)
+        application_ids = dict(inserted)
+        enqueue_feedback_jobs(list(application_ids.values()))
+    return application_ids
+
+def get_applications_for_rescoring(job_id, embedding_model, chunk_version=None):
+    """Stored component scores, resume text and embeddings of every application to a job. The
+    embedding is None if the resume has none from `embedding_model` yet, the chunk embeddings
+    unless they were computed with `chunk_version`."""
+    with transaction() as cursor:
+        cursor.execute("""
+            SELECT a.id, a.resume_id, r.resume_text, r.resume_embedding, r.embedding_model, a.keyword_score, a.semantic_score, a.llm_score, a.missing_keywords,
+                   r.chunk_embeddings, r.chunk_count, r.chunk_version, r.projects
+            FROM applications a LEFT JOIN resumes r ON a.resume_id = r.id
+            WHERE a.job_id = %s ORDER BY a.id
+        """, (job_id,))
+        return [{
+            'id': row[0],
+            'resume_id': row[1],
+            'resume_text': row[2] or "",
+            'resume_embedding': bytes_to_embedding(row[3]) if row[4] == embedding_model else None,
+            'keyword_score': row[5],
+            'semantic_score': row[6],
+            'llm_score': row[7],
+            'missing_keywords': row[8] or [],
+            'chunk_embeddings': bytes_to_chunk_embeddings(row[9], row[10]) if chunk_version is not None and row[11] == chunk_version else None,
+            'projects': row[12] or [],
+        } for row in cursor.fetchall()]
+
+def update_application_scores(rows):
+    """Writes (id, keyword, semantic, final, missing_keywords, project_mappings) rows back in one UPDATE;
+    project_mappings None keeps the stored mappings."""
+    if not rows:
+        return
+    with transaction() as cursor:
+        psycopg2.extras.execute_values(cursor, """
+            UPDATE applications AS a
+            SET keyword_score = v.keyword_score, semantic_score = v.semantic_score, final_score = v.final_score,
+                missing_keywords = v.missing_keywords, project_mappings = COALESCE(v.project_mappings, a.project_mappings)
+            FROM (VALUES %s) AS v (id, keyword_score, semantic_score, final_score, missing_keywords, project_mappings)
+            WHERE a.id = v.id
+        """, [(row[0], row[1], row[2], row[3], list(row[4]), psycopg2.extras.Json(row[5]) if row[5] is not None else None) for row in rows],
+            template="(%s::int, %s::real, %s::real, %s::real, %s::text[], %s::jsonb)", page_size=1000)
+
+def get_applicant_emails(job_id):
+    with transaction() as cursor:
+        cursor.execute("SELECT candidate_email FROM applications WHERE job_id = %s", (job_id,))
+        return {row[0] for row in cursor.fetchall()}
+
+# --- LLM Feedback Cache ---
+def get_cached_feedback(cache_key, ttl_seconds):
+    """Returns the cached LLM feedback for `cache_key` if it is younger than the TTL, else None."""
+    with transaction() as cursor:
+        cursor.execute("SELECT feedback FROM llm_feedback_cache WHERE cache_key = %s AND created_at > now() - make_interval(secs => %s)",
+                       (cache_key, ttl_seconds))
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+def put_cached_feedback(cache_key, feedback):
+    with transaction() as cursor:
+        cursor.execute("""
+            INSERT INTO llm_feedback_cache (cache_key, feedback) VALUES (%s, %s)
+            ON CONFLICT (cache_key) DO UPDATE SET feedback = EXCLUDED.feedback, created_at = now()
+        """, (cache_key, feedback))
+
+def purge_feedback_cache(ttl_seconds):
+    """Deletes expired cache entries and returns how many were removed."""
+    with transaction() as cursor:
+        cursor.execute("DELETE FROM llm_feedback_cache WHERE created_at <= now() - make_interval(secs => %s)", (ttl_seconds,))
+        return cursor.rowcount
+
+# --- LLM Feedback Queue ---
+def enqueue_feedback_jobs(application_ids):
+    """Queues (or re-queues) LLM feedback for many applications with two set-based statements."""
+    if not application_ids:
+        return
+    with transaction() as cursor:
+        cursor.execute("""
+            INSERT INTO feedback_jobs (application_id) SELECT unnest(%s::int[])
+            ON CONFLICT (application_id) DO UPDATE SET status = 'queued', attempts = 0, available_at = now(), locked_at = NULL
+        """, (list(application_ids),))
+        cursor.execute("UPDATE applications SET feedback_status = 'pending' WHERE id = ANY(%s) AND feedback_status <> 'pending'",
+                       (list(application_ids),))
+
+def enqueue_feedback_job(application_id):
+    enqueue_feedback_jobs([application_id])
+
+def claim_feedback_job(lease_seconds):
+    """Claims the next ready (or lease-expired) feedback job with everything the LLM call needs, or None."""
+    with transaction() as cursor:
+        cursor.execute("""
+            UPDATE feedback_jobs SET status = 'running', locked_at = now(), attempts = attempts + 1
+            WHERE id = (
+                SELECT id FROM feedback_jobs
+                WHERE (status = 'queued' AND available_at <= now())
+                   OR (status = 'running' AND locked_at < now() - make_interval(secs => %s))
+                ORDER BY available_at
+                LIMIT 1
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING id, application_id, attempts
+        """, (lease_seconds,))
+        claimed = cursor.fetchone()
+        if claimed is None:
+            return None
+        cursor.execute("""
+            SELECT j.description, r.resume_text, a.missing_keywords, j.jd_keywords, j.jd_embedding, j.analysis_version
+            FROM applications a JOIN jobs j ON a.job_id = j.id LEFT JOIN resumes r ON a.resume_id = r.id
+            WHERE a.id = %s
+        """, (claimed[1],))
+        row = cursor.fetchone()
+    return {
+        'id': claimed[0],
+        'application_id': claimed[1],
+        'attempts': claimed[2],
+        'jd_text': row[0],
+        'resume_text': row[1] or "",
+        'missing_keywords': row[2] or [],
+        'jd_keywords': row[3] or [],
+        'jd_embedding': bytes_to_embedding(row[4]),
+        'analysis_version': row[5],
+    }
+
+def complete_feedback_job(feedback_job_id, application_id, feedback, verdict, llm_score, token_counts=None):
+    """Stores the feedback and removes the job. The final score is computed here from the row's
+    current component scores and the job's current weights, so a rescore that ran during the LLM
+    call isn't overwritten. `token_counts` may hold prompt_tokens, response_tokens and
+    untrimmed_prompt_tokens for the call."""
+    token_counts = token_counts or {}
+    with transaction() as cursor:
+        cursor.execute("""
+            UPDATE applications AS a
+            SET ai_feedback = %s, verdict = %s, llm_score = %s, feedback_status = 'complete',
+                final_score = j.weight_keyword * COALESCE(a.keyword_score, 0) + j.weight_semantic * COALESCE(a.semantic_score, 0) + j.weight_llm * %s::real,
+                prompt_tokens = %s, response_tokens = %s, untrimmed_prompt_tokens = %s
+            FROM jobs j
+            WHERE a.id = %s AND j.id = a.job_id
+        """, (feedback, verdict, llm_score, llm_score, token_counts.get('prompt_tokens'), token_counts.get('response_tokens'),
+              token_counts.get('untrimmed_prompt_tokens'), application_id))
+        cursor.execute("DELETE FROM feedback_jobs WHERE id = %s", (feedback_job_id,))
+
+def fail_feedback_job(feedback_job_id, application_id, error, retry_in_seconds=None):
+    """Schedules a retry after `retry_in_seconds`, or marks the feedback as failed when it is None."""
+    with transaction() as cursor:
+        if retry_in_seconds is not None:
+            cursor.execute("""
+                UPDATE feedback_jobs SET status = 'queued', locked_at = NULL, last_error = %s,
+                       available_at = now() + make_interval(secs => %s)
+                WHERE id = %s
+            """, (error, retry_in_seconds, feedback_job_id))
+        else:
+            cursor.execute("UPDATE feedback_jobs SET status = 'failed', locked_at = NULL, last_error = %s WHERE id = %s",
+                           (error, feedback_job_id))
+            cursor.execute("UPDATE applications SET feedback_status = 'failed', verdict = 'N/A' WHERE id = %s", (application_id,))
+
+def get_feedback_token_stats():
+    """Totals of the token counts stored with completed feedback, overall and for calls that
+    actually reached the model (not served from the cache)."""
+    with transaction() as cursor:
+        cursor.execute("""
+            SELECT count(*), count(prompt_tokens), COALESCE(SUM(prompt_tokens), 0), COALESCE(SUM(response_tokens), 0),
+                   COALESCE(SUM(untrimmed_prompt_tokens) FILTER (WHERE prompt_tokens IS NOT NULL), 0)
+            FROM applications
+            WHERE feedback_status = 'complete' AND untrimmed_prompt_tokens IS NOT NULL
+        """)
+        row = cursor.fetchone()
+    return {
+        'applications': row[0],
+        'llm_calls': row[1],
+        'cache_hits': row[0] - row[1],
+        'prompt_tokens': row[2],
+        'response_tokens': row[3],
+        'untrimmed_prompt_tokens': row[4],
+        'prompt_tokens_saved': row[4] - row[2],
+        'prompt_tokens_avg': row[2] / row[1] if row[1] else 0.0,
+        'response_tokens_avg': row[3] / row[1] if row[1] else 0.0,
+    }
+
+# --- Job Stats ---
+def get_job_stats(job_id, thresholds=(), top_keywords=20):
+    """A job's status counts, score histogram, shortlist previews and most often missing keywords, read
+    from the trigger-maintained aggregates, or None if there is no such job."""
+    with transaction() as cursor:
+        cursor.execute("SELECT title FROM jobs WHERE id = %s", (job_id,))
+        job = cursor.fetchone()
+        if job is None:
+            return None
+        cursor.execute("SELECT bucket, status, applications FROM job_score_buckets WHERE job_id = %s", (job_id,))
+        buckets = cursor.fetchall()
+        cursor.execute("""
+            SELECT keyword, applications FROM job_keyword_gaps WHERE job_id = %s
+            ORDER BY applications DESC, keyword LIMIT %s
+        """, (job_id, top_keywords))
+        keywords = cursor.fetchall()
+    total = sum(count for _, _, count in buckets)
+    by_status, histogram = {}, {}
+    for bucket, status, count in buckets:
+        by_status[status] = by_status.get(status, 0) + count
+        histogram[bucket] = histogram.get(bucket, 0) + count
+    applied = [(bucket, count) for bucket, status, count in buckets if status == 'Applied']
+    return {
+        'job_id': job_id,
+        'title': job[0],
+        'applications': total,
+        'by_status': by_status,
+        # min_score -1 holds negative scores, 100 everything from 100 up
+        'score_histogram': [{'min_score': bucket, 'applications': histogram[bucket]} for bucket in sorted(histogram)],
+        'shortlist_preview': [{'threshold': t, 'shortlisted': sum(count for bucket, count in applied if bucket >= t),
+                               'not_shortlisted': sum(count for bucket, count in applied if bucket < t)} for t in thresholds],
+        'top_missing_keywords': [{'keyword': keyword, 'applications': count, 'share': count / total if total else 0.0}
+                                 for keyword, count in keywords],
+    }
+
+def encode_score_cursor(final_score, application_id):
+    return f"{final_score!r}:{application_id}"
+
+def decode_score_cursor(cursor_value):
+    """Parses a cursor made by encode_score_cursor; raises ValueError if it is malformed."""
+    score, application_id = cursor_value.rsplit(":", 1)
+    return float(score), int(application_id)
+
+def get_applications_for_job(job_id, limit=50, after=None, status=None, min_score=None, max_score=None):
+    """One page of a job's applications, best score first, as (rows, next_cursor); next_cursor is None on the last page."""
+    conditions, params = ["job_id = %s"], [job_id]
+    if status is not None:
+        conditions.append("status = %s")
+        params.append(status)
+    if min_score is not None:
+        conditions.append("final_score >= %s")
+        params.append(min_score)
+    if max_score is not None:
+        conditions.append("final_score <= %s")
+        params.append(max_score)
+    if after is not None:
+        conditions.append("(final_score, id) < (%s::real, %s)")
+        params.extend(decode_score_cursor(after))
+    with transaction() as cursor:
+        cursor.execute(f"""
+            SELECT id, candidate_name, candidate_email, final_score, verdict, status, missing_keywords, feedback_status
+            FROM applications
+            WHERE {" AND ".join(conditions)}
+            ORDER BY final_score DESC, id DESC
+            LIMIT %s
+        """, params + [limit + 1])
+        rows = list(_rows_as_dicts(cursor))
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_score_cursor(rows[-1]['final_score'], rows[-1]['id'])
+    return rows, next_cursor
+
+def get_dashboard(limit=50, job_cursors=None):
+    """Every job with the first (or `job_cursors`' next) page of its applications and its application count, in one query."""
+    job_cursors = job_cursors or {}
+    cursor_job_ids, cursor_scores, cursor_ids = [], [], []
+    for job_id, cursor_value in job_cursors.items():
+        score, application_id = decode_score_cursor(cursor_value)
+        cursor_job_ids.append(job_id)
+        cursor_scores.append(score)
+        cursor_ids.append(application_id)
+    with transaction() as cursor:
+        cursor.execute("""
+            SELECT j.id, j.title, counts.application_count,
+                   a.id, a.candidate_name, a.candidate_email, a.final_score, a.verdict, a.status, a.missing_keywords, a.feedback_status
+            FROM jobs j
+            LEFT JOIN unnest(%s::int[], %s::real[], %s::int[]) AS c (job_id, final_score, id) ON c.job_id = j.id
+            CROSS JOIN LATERAL (
+                SELECT COALESCE(SUM(applications), 0)::bigint AS application_count FROM job_score_buckets WHERE job_id = j.id
+            ) AS counts
+            LEFT JOIN LATERAL (
+                SELECT id, candidate_name, candidate_email, final_score, verdict, status, missing_keywords, feedback_status
+                FROM applications
+                WHERE job_id = j.id AND (c.job_id IS NULL OR (final_score, id) < (c.final_score, c.id))
+                ORDER BY final_score DESC, id DESC
+                LIMIT %s
+            ) AS a ON true
+            ORDER BY j.timestamp DESC, j.id DESC, a.final_score DESC, a.id DESC
+        """, (cursor_job_ids, cursor_scores, cursor_ids, limit + 1))
+        rows = cursor.fetchall()
+    jobs = {}
+    for row in rows:
+        job = jobs.setdefault(row[0], {'id': row[0], 'title': row[1], 'application_count': row[2], 'applications': [], 'next_cursor': None})
+        if row[3] is not None:
+            job['applications'].append({
+                'id': row[3], 'candidate_name': row[4], 'candidate_email': row[5], 'final_score': row[6],
+                'verdict': row[7], 'status': row[8], 'missing_keywords': row[9], 'feedback_status': row[10],
+            })
+    for job in jobs.values():
+        if len(job['applications']) > limit:
+            del job['applications'][limit:]
+            last = job['applications'][-1]
+            job['next_cursor'] = encode_score_cursor(last['final_score'], last['id'])
+    return list(jobs.values())
+
+# --- Search ---
+_SEARCH_COLUMNS = "a.id, a.job_id, a.candidate_name, a.candidate_email, a.final_score, a.verdict, a.status, a.missing_keywords, a.feedback_status, a.resume_id"
+
+def search_applications(query=None, skills=(), min_score=None, max_score=None, job_ids=(), status=None, limit=50, after=None, rank_window=None):
+    """One page of applications across all jobs matching every filter, as (rows, next_cursor, truncated).
+    With a `query`, only the best-scoring `rank_window` matches are ranked; `truncated` means more matched."""
+    resume_conditions, resume_params = [], []
+    if query:
+        resume_conditions.append("search_vector @@ websearch_to_tsquery('english', %s)")
+        resume_params.append(query)
+    required_terms = sorted({term for skill in skills for term in skill_terms(skill)})
+    if required_terms:
+        resume_conditions.append("skills @> %s::text[]")
+        resume_params.append(required_terms)
+    conditions, params = [], []
+    if resume_conditions:
+        # A semi-join leaves the planner free to walk applications by score and probe resumes
+        # (filters most resumes pass) or to start from the GIN matches (selective ones)
+        conditions.append(f"a.resume_id IN (SELECT id FROM resumes WHERE {' AND '.join(resume_conditions)})")
+        params.extend(resume_params)
+    if min_score is not None:
+        conditions.append("a.final_score >= %s")
+        params.append(min_score)
+    if max_score is not None:
+        conditions.append("a.final_score <= %s")
+        params.append(max_score)
+    if job_ids:
+        conditions.append("a.job_id = ANY(%s)")
+        params.append(list(job_ids))
+    if status is not None:
+        conditions.append("a.status = %s")
+        params.append(status)
+    cursor_position = decode_score_cursor(after) if after is not None else None
+    where = " AND ".join(conditions) or "true"
+    if query:
+        rank_window = rank_window or get_setting("SEARCH_RANK_WINDOW", 1000)
+        # Normalization 1 divides by 1 + log(length) so long resumes don't win on repetition alone
+        rank = "ts_rank(r.search_vector, websearch_to_tsquery('english', %s), 1)"
+        # One row past the window is fetched only to tell whether matches were left out
+        sql = f"""
+            SELECT {_SEARCH_COLUMNS}, j.title AS job_title, {rank} AS rank, a.window_rows
+            FROM (
+                SELECT w.*, row_number() OVER (ORDER BY w.final_score DESC, w.id DESC) AS position, count(*) OVER () AS window_rows
+                FROM (
+                    SELECT {_SEARCH_COLUMNS} FROM applications a
+                    WHERE {where}
+                    ORDER BY a.final_score DESC, a.id DESC
+                    LIMIT %s
+                ) AS w
+            ) AS a
+            JOIN resumes r ON r.id = a.resume_id
+            JOIN jobs j ON j.id = a.job_id
+            WHERE a.position <= %s{f" AND ({rank}, a.id) < (%s::real, %s)" if cursor_position else ""}
+            ORDER BY rank DESC, a.id DESC
+            LIMIT %s
+        """
+        params = [query] + params + [rank_window + 1, rank_window] + ([query, *cursor_position] if cursor_position else []) + [limit + 1]
+    else:
+        if cursor_position:
+            where += " AND (a.final_score, a.id) < (%s::real, %s)"
+            params.extend(cursor_position)
+        sql = f"""
+            SELECT {_SEARCH_COLUMNS}, j.title AS job_title
+            FROM applications a
+            JOIN jobs j ON j.id = a.job_id
+            WHERE {where}
+            ORDER BY a.final_score DESC, a.id DESC
+            LIMIT %s
+        """
+        params.append(limit + 1)
+    with transaction() as cursor:
+        cursor.execute(sql, params)
+        rows = list(_rows_as_dicts(cursor))
+    truncated = False
+    if query:
+        truncated = bool(rows) and rows[0]['window_rows'] > rank_window
+        for row in rows:
+            del row['window_rows']
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_score_cursor(rows[-1]['rank' if query else 'final_score'], rows[-1]['id'])
+    return rows, next_cursor, truncated
 
 def get_student_applications(candidate_email):
-    conn = get_db_connection()
     query = """
-    SELECT j.title, a.status, a.final_score, a.ai_feedback, a.verdict
+    SELECT j.title, a.status, a.final_score, a.ai_feedback, a.verdict, a.feedback_status
     FROM applications a
     JOIN jobs j ON a.job_id = j.id
-    WHERE a.candidate_email = %(email)s
+    WHERE a.candidate_email = %s
     ORDER BY a.timestamp DESC
     """
-    df = pd.read_sql_query(query, conn, params={'email': candidate_email})
-    conn.close()
-    return df
+    with transaction() as cursor:
+        cursor.execute(query, (candidate_email,))
+        return list(_rows_as_dicts(cursor))
 
 def shortlist_candidates(job_id, threshold):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("UPDATE applications SET status = 'Shortlisted' WHERE job_id = %s AND final_score >= %s AND status = 'Applied'", (job_id, threshold))
-    cursor.execute("UPDATE applications SET status = 'Not Shortlisted' WHERE job_id = %s AND final_score < %s AND status = 'Applied'", (job_id, threshold))
-    conn.commit()
-    cursor.close()
-    conn.close()
+    """Decides every 'Applied' application of a job by `threshold`; returns (shortlisted, not_shortlisted) counts."""
+    # Both updates run in one transaction so readers never see a half-applied shortlist
+    with transaction() as cursor:
+        cursor.execute("UPDATE applications SET status = 'Shortlisted' WHERE job_id = %s AND final_score >= %s AND status = 'Applied'", (job_id, threshold))
+        shortlisted = cursor.rowcount
+        cursor.execute("UPDATE applications SET status = 'Not Shortlisted' WHERE job_id = %s AND final_score < %s AND status = 'Applied'", (job_id, threshold))
+        return shortlisted, cursor.rowcount
+
+def preview_shortlist(job_id, threshold):
+    """What shortlist_candidates(job_id, threshold) would do, as (shortlisted, not_shortlisted),
+    read from the job's score buckets. Exact for integer thresholds from 0 to 100."""
+    with transaction() as cursor:
+        cursor.execute("""
+            SELECT COALESCE(SUM(applications) FILTER (WHERE bucket >= %s), 0), COALESCE(SUM(applications) FILTER (WHERE bucket < %s), 0)
+            FROM job_score_buckets
+            WHERE job_id = %s AND status = 'Applied'
+        """, (threshold, threshold, job_id))
+        return tuple(cursor.fetchone())
 
 def update_candidate_status(application_id, new_status):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("UPDATE applications SET status = %s WHERE id = %s", (new_status, application_id))
-    conn.commit()
-    cursor.close()
-    conn.close()
+    with transaction() as cursor:
+        cursor.execute("UPDATE applications SET status = %s WHERE id = %s", (new_status, application_id))
 
+def update_candidate_statuses(updates):
+    """Applies many (application_id, new_status) changes with one set-based UPDATE; returns the
+    number of applications updated."""
+    if not updates:
+        return 0
+    with transaction() as cursor:
+        updated = psycopg2.extras.execute_values(cursor, """
+            UPDATE applications AS a
+            SET status = v.status
+            FROM (VALUES %s) AS v (id, status)
+            WHERE a.id = v.id
+            RETURNING a.id
+        """, updates, template="(%s::int, %s::text)", page_size=1000, fetch=True)
+    return len(updated)
@@ -1,17 +1,234 @@
 import PyPDF2
 import docx
+import hashlib
+import io
+import os
+import queue
+import tempfile
+import time
+import zipfile
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
 
-def read_pdf(file):
+RESUME_EXTENSIONS = ('.pdf', '.docx', '.txt')
+
+# DOCX and TXT files have no real pages; their text is yielded in blocks of this size instead
+DOCX_PARAGRAPHS_PER_PAGE = 50
+TXT_CHARS_PER_PAGE = 64 * 1024
+SPOOL_CHUNK_BYTES = 1024 * 1024
+
+class ExtractionResult:
+    """Outcome of extracting one document. `error` is None on success; otherwise `error_code` is one
+    of 'too_large', 'unreadable', 'timeout' or 'crashed'. `truncated` is set when a page, character
+    or time budget cut the text short."""
+
+    def __init__(self, filename, text="", pages=0, truncated=False, error=None, error_code=None, parse_seconds=0.0):
+        self.filename = filename
+        self.text = text
+        self.pages = pages
+        self.truncated = truncated
+        self.error = error
+        self.error_code = error_code
+        self.parse_seconds = parse_seconds
+
+    @property
+    def ok(self):
+        return self.error is None
+
+class DocumentTooLarge(ValueError):
+    pass
+
+# --- Upload Spooling ---
+def spool_to_tempfile(stream, suffix="", max_bytes=None, directory=None):
+    """Copies a file-like upload to a named temp file in fixed-size chunks and returns the path and
+    the SHA-256 of the contents. Raises DocumentTooLarge (and removes the partial file) once more than
+    `max_bytes` were read."""
+    fd, path = tempfile.mkstemp(suffix=suffix, dir=directory)
+    digest = hashlib.sha256()
+    written = 0
     try:
-        pdf_reader = PyPDF2.PdfReader(file)
-        return "".join([page.extract_text() for page in pdf_reader.pages])
-    except Exception as e: return f"Error reading PDF: {e}"
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = stream.read(SPOOL_CHUNK_BYTES)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if max_bytes is not None and written > max_bytes:
+                    raise DocumentTooLarge(f"File is larger than {max_bytes} bytes.")
+                digest.update(chunk)
+                out.write(chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path, digest.hexdigest()
 
-def read_docx(file):
+# --- Per-page Extraction ---
+def iter_pdf_pages(file):
+    for page in PyPDF2.PdfReader(file).pages:
+        yield page.extract_text() or ""
+
+def iter_docx_pages(file):
+    paragraphs = [para.text for para in docx.Document(file).paragraphs]
+    for start in range(0, len(paragraphs), DOCX_PARAGRAPHS_PER_PAGE):
+        yield "\n".join(paragraphs[start:start + DOCX_PARAGRAPHS_PER_PAGE])
+
+def iter_txt_pages(file):
+    reader = io.TextIOWrapper(file, encoding='utf-8')
+    while True:
+        block = reader.read(TXT_CHARS_PER_PAGE)
+        if not block:
+            break
+        yield block
+
+def iter_document_pages(file, filename):
+    """Yields a document's text page by page (blocks for DOCX/TXT), dispatching on the file extension."""
+    if filename.lower().endswith('.pdf'): return iter_pdf_pages(file)
+    elif filename.lower().endswith('.docx'): return iter_docx_pages(file)
+    else: return iter_txt_pages(file)
+
+def extract_document(path, filename, max_pages=None, max_chars=None, max_bytes=None, time_budget=None):
+    """Extracts a document's text page by page within the given budgets and returns an ExtractionResult."""
+    start = time.perf_counter()
+    result = ExtractionResult(filename)
     try:
-        doc = docx.Document(file)
-        return "\n".join([para.text for para in doc.paragraphs])
-    except Exception as e: return f"Error reading DOCX: {e}"
+        if max_bytes is not None and os.path.getsize(path) > max_bytes:
+            result.error, result.error_code = f"File is larger than {max_bytes} bytes.", 'too_large'
+            return result
+        parts, chars = [], 0
+        with open(path, "rb") as file:
+            pages = iter_document_pages(file, filename)
+            for page_text in pages:
+                if max_chars is not None and chars + len(page_text) > max_chars:
+                    parts.append(page_text[:max_chars - chars])
+                    result.pages += 1
+                    result.truncated = True
+                    break
+                parts.append(page_text)
+                chars += len(page_text)
+                result.pages += 1
+                if max_pages is not None and result.pages >= max_pages:
+                    result.truncated = next(pages, None) is not None
+                    break
+                if time_budget is not None and time.perf_counter() - start > time_budget:
+                    result.truncated = True
+                    break
+        result.text = "\n".join(parts)
+    except Exception as e:
+        result.error, result.error_code = f"Unreadable document: {e}", 'unreadable'
+    finally:
+        result.parse_seconds = time.perf_counter() - start
+    return result
+
+# --- Killable Extraction Workers ---
+def _extraction_worker_main(conn, budgets):
+    """Child process loop: extracts the (path, filename) requests sent over `conn` until told to stop."""
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            return
+        if request is None:
+            return
+        path, filename = request
+        conn.send(extract_document(path, filename, **budgets))
+
+class ExtractionWorker:
+    """One long-lived child process that extracts documents, killed and restarted if one overruns."""
+
+    def __init__(self, context, timeout, budgets):
+        self.context = context
+        self.timeout = timeout
+        self.budgets = budgets
+        self._process = None
+        self._conn = None
+
+    def _ensure_started(self):
+        if self._process is not None and self._process.is_alive():
+            return
+        self._conn, child_conn = self.context.Pipe()
+        self._process = self.context.Process(target=_extraction_worker_main, args=(child_conn, self.budgets),
+                                             name="document-extractor", daemon=True)
+        self._process.start()
+        child_conn.close()
+
+    def kill(self):
+        if self._process is not None:
+            self._process.kill()
+            self._process.join()
+            self._conn.close()
+        self._process = self._conn = None
+
+    def extract(self, path, filename):
+        start = time.perf_counter()
+        self._ensure_started()
+        try:
+            self._conn.send((path, filename))
+            if self._conn.poll(self.timeout):
+                return self._conn.recv()
+            self.kill()
+            return ExtractionResult(filename, error=f"Extraction took longer than {self.timeout}s.", error_code='timeout',
+                                    parse_seconds=time.perf_counter() - start)
+        except (EOFError, OSError) as e:
+            # The child died mid-document (e.g. killed for memory); start a fresh one next time
+            self.kill()
+            return ExtractionResult(filename, error=f"Extraction process failed: {e!r}", error_code='crashed',
+                                    parse_seconds=time.perf_counter() - start)
+
+    def close(self):
+        if self._process is not None and self._process.is_alive():
+            try:
+                self._conn.send(None)
+                self._process.join(1)
+            except OSError:
+                pass
+        self.kill()
+
+class ExtractionPool:
+    """A fixed set of ExtractionWorkers shared by request threads; callers block until one is free."""
+
+    def __init__(self, size, timeout, max_pages=None, max_chars=None, max_bytes=None, time_budget=None):
+        # spawn: the children only need this module, not a copy of the API process and its threads
+        context = multiprocessing.get_context("spawn")
+        budgets = {'max_pages': max_pages, 'max_chars': max_chars, 'max_bytes': max_bytes, 'time_budget': time_budget}
+        self.size = size
+        self._workers = [ExtractionWorker(context, timeout, budgets) for _ in range(size)]
+        self._idle = queue.Queue()
+        for worker in self._workers:
+            self._idle.put(worker)
+
+    def extract(self, path, filename):
+        worker = self._idle.get()
+        try:
+            return worker.extract(path, filename)
+        finally:
+            self._idle.put(worker)
+
+    def map(self, documents):
+        """Extracts (path, filename) pairs on all workers at once; results keep the input order."""
+        with ThreadPoolExecutor(max_workers=self.size) as executor:
+            return list(executor.map(lambda document: self.extract(*document), documents))
+
+    def close(self):
+        for worker in self._workers:
+            worker.close()
 
-def read_txt(file):
-    return file.read().decode('utf-8')
\ No newline at end of file
+# --- Archives ---
+def unpack_resume_archive(archive_path, directory, max_files, max_total_bytes):
+    """Extracts every resume in a zip archive into `directory` and returns (filename, path, sha256) tuples.
+    Raises ValueError, before inflating anything, if it holds too many files or bytes."""
+    with zipfile.ZipFile(archive_path) as archive:
+        members = [info for info in archive.infolist()
+                   if not info.is_dir() and not info.filename.startswith('__MACOSX/')
+                   and info.filename.lower().endswith(RESUME_EXTENSIONS)]
+        if len(members) > max_files:
+            raise ValueError(f"Archive contains {len(members)} resumes; the limit is {max_files}.")
+        if sum(info.file_size for info in members) > max_total_bytes:
+            raise ValueError(f"Archive expands to more than {max_total_bytes} bytes.")
+        unpacked = []
+        for info in members:
+            filename = info.filename.rsplit('/', 1)[-1]
+            # Member names are never used as paths, so '../' entries can't escape `directory`
+            with archive.open(info) as source:
+                path, sha256 = spool_to_tempfile(source, os.path.splitext(filename)[1], directory=directory)
+            unpacked.append((filename, path, sha256))
+        return unpacked
@@ -0,0 +1,206 @@
+import os
+import time
+from abc import ABC, abstractmethod
+import numpy as np
+from core.config import get_setting
+
+EMBEDDING_MODEL_NAME = 'all-MiniLM-L6-v2'
+# all-MiniLM-L6-v2 is trained on 256-token inputs; longer text is truncated by every backend alike
+MAX_SEQ_LENGTH = 256
+
+# --- Backends ---
+# Each backend turns a list of texts into a (len(texts), dim) matrix of L2-normalized float32 rows.
+# torch, onnxruntime and transformers are imported by the backend that needs them, on load.
+
+class EmbeddingBackend(ABC):
+    name = None
+
+    def __init__(self, model_name=EMBEDDING_MODEL_NAME, num_threads=0):
+        self.model_name = model_name
+        self.num_threads = num_threads
+
+    @property
+    def version(self):
+        return embedding_version(self.name, self.model_name)
+
+    @abstractmethod
+    def encode(self, texts, batch_size=32):
+        pass
+
+class TorchBackend(EmbeddingBackend):
+    """fp32 SentenceTransformer on PyTorch: the reference the other backends are checked against."""
+    name = 'torch'
+
+    def __init__(self, model_name=EMBEDDING_MODEL_NAME, num_threads=0):
+        super().__init__(model_name, num_threads)
+        import torch
+        from sentence_transformers import SentenceTransformer
+        if num_threads:
+            torch.set_num_threads(num_threads)
+        print(f"Loading SentenceTransformer model ({self.name})...")
+        self.model = SentenceTransformer(model_name)
+
+    def encode(self, texts, batch_size=32):
+        embeddings = self.model.encode(list(texts), batch_size=batch_size, convert_to_numpy=True, normalize_embeddings=True)
+        return np.asarray(embeddings, dtype=np.float32).reshape(len(texts), -1)
+
+class OnnxBackend(EmbeddingBackend):
+    """The same transformer exported to ONNX and run with ONNX Runtime, followed by the model's mean
+    pooling and normalization in NumPy. The export is done once (it needs torch) and cached on disk."""
+    name = 'onnx'
+
+    def __init__(self, model_name=EMBEDDING_MODEL_NAME, num_threads=0, cache_dir=None):
+        super().__init__(model_name, num_threads)
+        import onnxruntime
+        from transformers import AutoTokenizer
+        self.cache_dir = cache_dir or get_setting("EMBEDDING_CACHE_DIR", "data/models")
+        print(f"Loading SentenceTransformer model ({self.name})...")
+        model_path = self._model_path()
+        self.tokenizer = AutoTokenizer.from_pretrained(self._tokenizer_dir())
+        options = onnxruntime.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+            options.inter_op_num_threads = 1
+        self.session = onnxruntime.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self._input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+    def _tokenizer_dir(self):
+        return os.path.join(self.cache_dir, f"{self.model_name}-tokenizer")
+
+    def _fp32_path(self):
+        path = os.path.join(self.cache_dir, f"{self.model_name}.onnx")
+        if not os.path.exists(path):
+            export_onnx(self.model_name, path, self._tokenizer_dir())
+        return path
+
+    def _model_path(self):
+        return self._fp32_path()
+
+    def encode(self, texts, batch_size=32):
+        texts = list(texts)
+        batches = []
+        for start in range(0, len(texts), batch_size):
+            tokens = self.tokenizer(texts[start:start + batch_size], padding=True, truncation=True,
+                                    max_length=MAX_SEQ_LENGTH, return_tensors="np")
+            feed = {name: tokens[name].astype(np.int64) for name in self._input_names}
+            hidden = self.session.run(None, feed)[0]
+            mask = tokens["attention_mask"][..., None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            batches.append(pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None))
+        if not batches:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.concatenate(batches).astype(np.float32)
+
+class OnnxInt8Backend(OnnxBackend):
+    """OnnxBackend with the weights dynamically quantized to int8: the fastest CPU option, at a small
+    accuracy cost that check_parity measures."""
+    name = 'onnx-int8'
+
+    def _model_path(self):
+        path = os.path.join(self.cache_dir, f"{self.model_name}.int8.onnx")
+        if not os.path.exists(path):
+            from onnxruntime.quantization import quantize_dynamic, QuantType
+            quantize_dynamic(self._fp32_path(), path, weight_type=QuantType.QInt8)
+        return path
+
+BACKENDS = {backend.name: backend for backend in (TorchBackend, OnnxBackend, OnnxInt8Backend)}
+
+def export_onnx(model_name, path, tokenizer_dir):
+    """Exports the SentenceTransformer's transformer to ONNX with dynamic batch and sequence axes,
+    and saves its tokenizer next to it so the ONNX backends never need torch or the hub again."""
+    import torch
+    from sentence_transformers import SentenceTransformer
+    transformer = SentenceTransformer(model_name)[0]
+    model, tokenizer = transformer.auto_model.eval(), transformer.tokenizer
+    sample = tokenizer(["an example sentence"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with torch.no_grad():
+        torch.onnx.export(model, tuple(sample[name] for name in input_names), path, input_names=input_names,
+                          output_names=["last_hidden_state"], opset_version=14,
+                          dynamic_axes={**{name: {0: "batch", 1: "sequence"} for name in input_names},
+                                        "last_hidden_state": {0: "batch", 1: "sequence"}})
+    tokenizer.save_pretrained(tokenizer_dir)
+
+def embedding_version(backend_name, model_name=EMBEDDING_MODEL_NAME):
+    """Tag stored with every embedding (and in the JD analysis version and candidate index) so vectors
+    from different backends are never compared. fp32 torch keeps the bare model name used before
+    backends were selectable, so existing embeddings stay valid."""
+    return model_name if backend_name == 'torch' else f"{model_name}/{backend_name}"
+
+EMBEDDING_BACKEND = get_setting("EMBEDDING_BACKEND", "torch")
+EMBEDDING_VERSION = embedding_version(EMBEDDING_BACKEND)
+
+def load_embedding_backend(name=None, num_threads=None):
+    """Loads the configured embedding backend (EMBEDDING_BACKEND, EMBEDDING_THREADS; 0 = library default)."""
+    name = name or EMBEDDING_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown EMBEDDING_BACKEND {name!r}; choose one of {', '.join(BACKENDS)}.")
+    return BACKENDS[name](num_threads=get_setting("EMBEDDING_THREADS", 0) if num_threads is None else num_threads)
+
+# --- Parity Check ---
+def check_parity(candidate, baseline, jd_texts, resume_texts, batch_size=32):
+    """Compares a backend's vectors, JD-resume score drift and throughput against the fp32 baseline."""
+    texts = list(jd_texts) + list(resume_texts)
+    timings = {}
+    vectors = {}
+    for label, backend in (("baseline", baseline), ("candidate", candidate)):
+        backend.encode(texts[:1])  # first call pays one-time setup costs
+        start = time.perf_counter()
+        vectors[label] = backend.encode(texts, batch_size)
+        timings[label] = len(texts) / (time.perf_counter() - start)
+    vector_cosines = np.sum(vectors["baseline"] * vectors["candidate"], axis=1)
+    n_jds = len(jd_texts)
+    baseline_scores = vectors["baseline"][n_jds:] @ vectors["baseline"][:n_jds].T * 100
+    candidate_scores = vectors["candidate"][n_jds:] @ vectors["candidate"][:n_jds].T * 100
+    score_drift = np.abs(candidate_scores - baseline_scores)
+    # Does each JD keep the same best resume?
+    top_match_agreement = float(np.mean(baseline_scores.argmax(axis=0) == candidate_scores.argmax(axis=0))) if n_jds else 1.0
+    return {
+        "baseline": baseline.version,
+        "candidate": candidate.version,
+        "texts": len(texts),
+        "vector_cosine_min": float(vector_cosines.min()),
+        "vector_cosine_mean": float(vector_cosines.mean()),
+        "score_drift_max": float(score_drift.max()) if score_drift.size else 0.0,
+        "score_drift_mean": float(score_drift.mean()) if score_drift.size else 0.0,
+        "top_match_agreement": top_match_agreement,
+        "baseline_texts_per_second": round(timings["baseline"], 1),
+        "candidate_texts_per_second": round(timings["candidate"], 1),
+    }
+
+def _read_texts(directory):
+    texts = []
+    for filename in sorted(os.listdir(directory)):
+        if filename.lower().endswith(".txt"):
+            with open(os.path.join(directory, filename), encoding="utf-8") as f:
+                texts.append(f.read())
+    return texts
+
+SAMPLE_JDS = [
+    "Backend developer with Python, Django, PostgreSQL and REST API experience. Docker and AWS a plus.",
+    "Data scientist skilled in machine learning, pandas, scikit-learn and deep learning with PyTorch.",
+    "Frontend engineer: React, TypeScript, CSS and accessibility; experience with design systems.",
+]
+SAMPLE_RESUMES = [
+    "Software engineer. Built REST APIs in Python and Django backed by PostgreSQL, deployed with Docker on AWS.",
+    "ML intern. Trained gradient boosting and neural network models with scikit-learn and PyTorch; pandas pipelines.",
+    "Web developer. React and TypeScript single-page apps, component libraries, responsive CSS and WCAG audits.",
+    "Mechanical engineering graduate with CAD, SolidWorks and thermodynamics coursework.",
+]
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Report the drift of an embedding backend against the fp32 PyTorch baseline.")
+    parser.add_argument("--backend", default=EMBEDDING_BACKEND, choices=sorted(BACKENDS))
+    parser.add_argument("--threads", type=int, default=get_setting("EMBEDDING_THREADS", 0))
+    parser.add_argument("--jds", help="directory of .txt job descriptions (default: built-in samples)")
+    parser.add_argument("--resumes", help="directory of .txt resumes (default: built-in samples)")
+    args = parser.parse_args()
+
+    report = check_parity(load_embedding_backend(args.backend, args.threads), load_embedding_backend("torch", args.threads),
+                          _read_texts(args.jds) if args.jds else SAMPLE_JDS,
+                          _read_texts(args.resumes) if args.resumes else SAMPLE_RESUMES)
+    print(json.dumps(report, indent=2))
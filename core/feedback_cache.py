@@ -0,0 +1,72 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from core.config import get_setting
+from core.database import get_cached_feedback, put_cached_feedback, purge_feedback_cache
+
+def feedback_cache_key(prompt_version, jd_text, resume_text, missing_keywords):
+    """Content address of an LLM feedback request: identical inputs always map to the same key."""
+    digest = hashlib.sha256()
+    for part in (prompt_version, jd_text, resume_text, "\x1f".join(missing_keywords)):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x1e")
+    return digest.hexdigest()
+
+class FeedbackCache:
+    """Two-tier cache for LLM feedback: an in-process LRU in front of a shared Postgres table with a TTL."""
+
+    def __init__(self, max_entries=None, ttl_seconds=None, purge_interval=None):
+        self.max_entries = max_entries or get_setting("FEEDBACK_CACHE_MAX_ENTRIES", 1024)
+        self.ttl_seconds = ttl_seconds or get_setting("FEEDBACK_CACHE_TTL_SECONDS", 30 * 24 * 3600)
+        self.purge_interval = purge_interval or get_setting("FEEDBACK_CACHE_PURGE_SECONDS", 3600)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_purge = 0.0
+        self._stats = {'memory_hits': 0, 'db_hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+
+    def _remember(self, key, value, created_at):
+        with self._lock:
+            self._entries[key] = (value, created_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[1] < self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self._stats['memory_hits'] += 1
+                return entry[0]
+        value = get_cached_feedback(key, self.ttl_seconds)
+        with self._lock:
+            self._stats['db_hits' if value is not None else 'misses'] += 1
+        if value is not None:
+            # The row's real age isn't known here; treating it as fresh only delays expiry by one TTL in-process
+            self._remember(key, value, now)
+        return value
+
+    def put(self, key, value):
+        now = time.time()
+        self._remember(key, value, now)
+        put_cached_feedback(key, value)
+        with self._lock:
+            self._stats['stores'] += 1
+            purge_due = now - self._last_purge > self.purge_interval
+            if purge_due:
+                self._last_purge = now
+        if purge_due:
+            purge_feedback_cache(self.ttl_seconds)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['memory_entries'] = len(self._entries)
+        lookups = stats['memory_hits'] + stats['db_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['memory_hits'] + stats['db_hits']) / lookups if lookups else 0.0
+        return stats
+
+feedback_cache = FeedbackCache()
@@ -0,0 +1,119 @@
+import asyncio
+from core.config import get_setting
+from core.database import claim_feedback_job, complete_feedback_job, fail_feedback_job
+from core.llm_analyzer import acached_ai_feedback, parse_ai_feedback, feedback_prompt_tokens, JD_ANALYSIS_VERSION
+from core.metrics import timed_stage
+from core.prompt_budget import budget_feedback_inputs
+
+async def fail_job(job, error):
+    """Schedules a retry with exponential backoff, or marks the feedback failed after FEEDBACK_MAX_ATTEMPTS."""
+    max_attempts = get_setting("FEEDBACK_MAX_ATTEMPTS", 3)
+    retry_in = 30 * 2 ** (job['attempts'] - 1) if job['attempts'] < max_attempts else None
+    await asyncio.to_thread(fail_feedback_job, job['id'], job['application_id'], str(error), retry_in)
+
+async def process_feedback_job(job, llm_model, embedding_backend=None):
+    """Runs the LLM for one claimed job on budgeted prompt inputs and stores the feedback and token counts."""
+    # A JD embedding stored by another model can't be compared with this backend's vectors
+    jd_embedding = job['jd_embedding'] if job['analysis_version'] == JD_ANALYSIS_VERSION else None
+    with timed_stage("feedback", "budget"):
+        jd_text, resume_text = await asyncio.to_thread(budget_feedback_inputs, job['jd_text'], job['resume_text'], job['jd_keywords'],
+                                                       jd_embedding, embedding_backend)
+    try:
+        with timed_stage("feedback", "llm"):
+            raw_feedback, token_counts = await acached_ai_feedback(jd_text, resume_text, job['missing_keywords'], llm_model)
+    except Exception as e:
+        await fail_job(job, e)
+        return False
+    llm_score, verdict, ai_feedback_text = parse_ai_feedback(raw_feedback)
+    # The untrimmed size is an estimate; scaled by the model's count for the trimmed prompt it is
+    # in the same units as prompt_tokens
+    untrimmed = feedback_prompt_tokens(job['jd_text'], job['resume_text'], job['missing_keywords'])
+    token_counts = dict(token_counts or {}, untrimmed_prompt_tokens=untrimmed)
+    if token_counts.get('prompt_tokens'):
+        trimmed = feedback_prompt_tokens(jd_text, resume_text, job['missing_keywords'])
+        token_counts['untrimmed_prompt_tokens'] = round(untrimmed * token_counts['prompt_tokens'] / trimmed)
+    with timed_stage("feedback", "store"):
+        await asyncio.to_thread(complete_feedback_job, job['id'], job['application_id'], ai_feedback_text, verdict, llm_score, token_counts)
+    return True
+
+class FeedbackWorkerPool:
+    """Background asyncio tasks that drain the feedback_jobs queue; any number of pools can share a database."""
+
+    def __init__(self, llm, num_workers=None, poll_interval=None, lease_seconds=None, embedding_backend=None):
+        self.llm = llm
+        self.embedding_backend = embedding_backend if get_setting("PROMPT_RELEVANCE_EMBEDDINGS", True) else None
+        self.num_workers = num_workers or get_setting("FEEDBACK_WORKERS", 2)
+        self.poll_interval = poll_interval or get_setting("FEEDBACK_POLL_SECONDS", 2.0)
+        self.lease_seconds = lease_seconds or get_setting("FEEDBACK_LEASE_SECONDS", 300)
+        self._loop = None
+        self._wakeup = None
+        self._stopping = False
+        self._tasks = []
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._tasks = [asyncio.create_task(self._run(), name=f"feedback-worker-{i}") for i in range(self.num_workers)]
+
+    async def stop(self, timeout=None):
+        if not self._tasks:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        _, pending = await asyncio.wait(self._tasks, timeout=timeout)
+        for task in pending:
+            # Interrupted jobs keep their lease and are retried after it expires
+            task.cancel()
+        self._tasks = []
+
+    def notify(self):
+        """Wakes idle workers immediately instead of waiting for the next poll. Safe to call from any thread."""
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                job = await asyncio.to_thread(claim_feedback_job, self.lease_seconds)
+            except Exception as e:
+                print(f"Feedback worker could not poll the queue: {e}")
+                job = None
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                continue
+            try:
+                llm_model = await asyncio.to_thread(self.llm.get)
+                embedding_backend = await asyncio.to_thread(self.embedding_backend.get) if self.embedding_backend is not None else None
+                await process_feedback_job(job, llm_model, embedding_backend)
+            except Exception as e:
+                # Counted as an attempt like an LLM error, so a job that always fails is eventually given up
+                print(f"Feedback worker failed on application {job['application_id']}: {e}")
+                try:
+                    await fail_job(job, e)
+                except Exception as e:
+                    # The job keeps its lease and is retried by whichever worker picks it up after expiry
+                    print(f"Feedback worker could not record the failure: {e}")
+
+async def run_standalone():
+    from core.llm_analyzer import load_llm_model
+    from core.embeddings import load_embedding_backend
+    from core.models import LazyModel
+
+    pool = FeedbackWorkerPool(LazyModel("llm", load_llm_model), embedding_backend=LazyModel("embedding_backend", load_embedding_backend))
+    await pool.start()
+    print(f"Started {pool.num_workers} feedback worker(s). Press Ctrl+C to stop.")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await pool.stop(timeout=5)
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(run_standalone())
+    except KeyboardInterrupt:
+        pass
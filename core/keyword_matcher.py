@@ -0,0 +1,99 @@
+import re
+from functools import lru_cache
+
+# Word-like tokens, keeping tech names such as c++, c#, node.js and asp.net in one piece
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#]*(?:\.[a-z0-9+#]+)*")
+
+def normalize_token(token):
+    """Folds simple plural inflections so 'developers' matches the JD lemma 'developer'.
+    Applied identically to JD keywords and resume tokens, so the fold only needs to be consistent.
+    Tech names with '.' or '+' (node.js, c++) are left alone."""
+    if "." in token or "+" in token:
+        return token
+    if len(token) > 5 and token.endswith("yses"):
+        return token[:-2] + "is"
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 4 and token.endswith(("ches", "shes", "sses", "xes")):
+        return token[:-2]
+    if len(token) > 3 and token.endswith("s") and not token.endswith(("ss", "us", "is")):
+        return token[:-1]
+    return token
+
+def tokenize(text):
+    return [normalize_token(token) for token in TOKEN_PATTERN.findall(text.lower())]
+
+# Generic resume/JD words JD keyword extraction skips on top of spaCy's English stop words
+CUSTOM_STOP_WORDS = {'experience', 'work', 'skill', 'skills', 'knowledge', 'plus', 'candidate', 'track', 'record', 'ideal', 'platform', 'platforms'}
+# Single-letter tokens and stop words kept as terms because they name languages
+SINGLE_LETTER_TERMS = frozenset({"c", "r"})
+LANGUAGE_STOP_WORDS = frozenset({"go"})
+
+@lru_cache(maxsize=1)
+def _stop_terms():
+    # Imported on first use, like the spaCy model, so importing this module stays cheap
+    from spacy.lang.en.stop_words import STOP_WORDS
+    words = (STOP_WORDS | CUSTOM_STOP_WORDS) - LANGUAGE_STOP_WORDS
+    return frozenset(words | {normalize_token(word) for word in words})
+
+def skill_terms(text):
+    """Sorted distinct normalized tokens of a text that can be JD keywords: no stop words, bare numbers
+    or single letters other than c and r. Stored per resume as its searchable skills, so a skill
+    filter compares exactly what the keyword matcher would match."""
+    stop_terms = _stop_terms()
+    return sorted({token for token in tokenize(text)
+                   if token not in stop_terms and not token.isdigit() and (len(token) > 1 or token in SINGLE_LETTER_TERMS)})
+
+class KeywordMatch:
+    def __init__(self, matched, missing, project_matches, score):
+        self.matched = matched
+        self.missing = missing
+        self.project_matches = project_matches
+        self.score = score
+
+class KeywordMatcher:
+    """Matches a job's keywords against resumes on whole normalized tokens, in one pass per resume."""
+
+    def __init__(self, keywords):
+        self.keywords = list(dict.fromkeys(keywords))
+        # First token -> [(remaining tokens, keyword)], so each resume token costs one dict lookup
+        self._index = {}
+        for keyword in self.keywords:
+            tokens = tokenize(keyword)
+            if tokens:
+                self._index.setdefault(tokens[0], []).append((tuple(tokens[1:]), keyword))
+
+    def _match_tokens(self, tokens):
+        found = []
+        for i, token in enumerate(tokens):
+            for rest, keyword in self._index.get(token, ()):
+                if not rest or tuple(tokens[i + 1:i + 1 + len(rest)]) == rest:
+                    found.append(keyword)
+        return found
+
+    def scan(self, resume_text, projects=()):
+        """Returns a KeywordMatch for the resume; `projects` are lines of the resume (as returned by
+        extract_projects) whose individual matches should be reported."""
+        project_lines = {project.strip().lower(): project for project in projects}
+        matched = set()
+        project_matches = {}
+        for line in resume_text.lower().split("\n"):
+            line_matches = self._match_tokens(tokenize(line))
+            if not line_matches:
+                continue
+            matched.update(line_matches)
+            project = project_lines.get(line.strip())
+            if project is not None:
+                project_matches[project] = [kw for kw in self.keywords if kw in line_matches]
+        matched_keywords = [kw for kw in self.keywords if kw in matched]
+        missing_keywords = [kw for kw in self.keywords if kw not in matched]
+        score = (len(matched_keywords) / len(self.keywords)) * 100 if self.keywords else 0
+        return KeywordMatch(matched_keywords, missing_keywords, project_matches, score)
+
+@lru_cache(maxsize=256)
+def _cached_matcher(keywords):
+    return KeywordMatcher(keywords)
+
+def get_keyword_matcher(jd_keywords):
+    """Compiled matcher for a job's keyword list, cached so each job builds it once per process."""
+    return _cached_matcher(tuple(jd_keywords))
@@ -1,36 +1,89 @@
-import spacy
 import re
+import asyncio
+import numpy as np
 from collections import Counter
-from sentence_transformers import SentenceTransformer, util
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser
-import streamlit as st
+from core.config import get_setting
+from core.feedback_cache import feedback_cache, feedback_cache_key
+from core.embeddings import EMBEDDING_VERSION
+from core.keyword_matcher import CUSTOM_STOP_WORDS
+from core.metrics import observe_llm_call, observe_llm_tokens, estimate_tokens
 
 # --- Model Loading (Kept separated to prevent conflicts) ---
-@st.cache_resource
+# spaCy, torch and langchain are imported inside the loaders so that importing this module stays
+# cheap; callers cache the loaded models (see core.models.LazyModel)
+# Keyword extraction only reads lemmas, POS tags and stop-word flags, so the dependency parser and
+# the entity recognizer (most of the pipeline's runtime) are not loaded at all. Neither feeds the
+# tagger or lemmatizer, so the extracted keywords are unchanged.
+SPACY_EXCLUDE = ["parser", "ner"]
+
 def load_spacy_model():
-    """Loads only the spaCy model."""
+    """Loads only the spaCy model, without the components keyword extraction doesn't use."""
+    import spacy
     print("Loading spaCy model...")
-    return spacy.load("en_core_web_sm")
+    return spacy.load("en_core_web_sm", exclude=SPACY_EXCLUDE)
+
+def load_llm_model():
+    """Loads the Gemini chat model, or returns None if it can't be configured."""
+    try:
+        from langchain_google_genai import ChatGoogleGenerativeAI
+        return ChatGoogleGenerativeAI(model="gemini-1.5-flash-latest", google_api_key=get_setting("GOOGLE_API_KEY"),
+                                      convert_system_message_to_human=True)
+    except Exception as e:
+        print(f"Error loading LLM: {e}")
+        return None
 
-@st.cache_resource
-def load_transformer_model():
-    """Loads only the SentenceTransformer model."""
-    print("Loading SentenceTransformer model...")
-    return SentenceTransformer('all-MiniLM-L6-v2')
+# Stored JD analyses carry this tag. Bump it whenever the keyword extractor changes; the embedding
+# part follows the model and backend (core.embeddings) so old jobs get recomputed instead of mixing
+# vector spaces.
+JD_ANALYSIS_VERSION = f"kw-v1/{EMBEDDING_VERSION}"
+
+# Weights of the keyword, semantic and LLM components in the final score
+SCORE_WEIGHTS = {'keyword': 0.3, 'semantic': 0.5, 'llm': 0.2}
+
+# How the semantic score is computed: 'single' compares the JD with one embedding of the whole
+# resume (which the model truncates after ~256 word pieces); the chunk modes embed each section
+# chunk and take the best chunk ('chunk-max') or the mean of the best CHUNK_TOP_K ('chunk-mean-top-k')
+SEMANTIC_MODES = ('single', 'chunk-max', 'chunk-mean-top-k')
+SEMANTIC_SCORING = get_setting("SEMANTIC_SCORING", "single")
+if SEMANTIC_SCORING not in SEMANTIC_MODES:
+    raise ValueError(f"Unknown SEMANTIC_SCORING {SEMANTIC_SCORING!r}; choose one of {', '.join(SEMANTIC_MODES)}.")
+CHUNK_TOP_K = get_setting("CHUNK_TOP_K", 3)
+# Words per chunk, chosen to stay under the model's 256 word-piece limit, and a cap on chunks per resume
+CHUNK_WORDS = get_setting("CHUNK_WORDS", 150)
+CHUNK_MAX_PER_RESUME = get_setting("CHUNK_MAX_PER_RESUME", 32)
+# Stored chunk embeddings carry this tag; bump it whenever the chunking changes
+CHUNK_VERSION = f"chunks-v1/{CHUNK_WORDS}/{EMBEDDING_VERSION}"
 
 # --- Helper Functions ---
-def improved_extract_keywords(text, nlp_model):
-    custom_stop_words = ['experience', 'work', 'skill', 'skills', 'knowledge', 'plus', 'candidate', 'track', 'record', 'ideal', 'platform', 'platforms']
-    doc = nlp_model(text.lower())
-    keywords = [token.lemma_ for token in doc if (not token.is_stop and not token.is_punct and token.pos_ in ['PROPN', 'NOUN', 'ADJ'] and token.lemma_ not in custom_stop_words)]
+def keywords_from_doc(doc):
+    """The 15 most frequent content lemmas of an already processed spaCy Doc."""
+    keywords = [token.lemma_ for token in doc if (not token.is_stop and not token.is_punct and token.pos_ in ['PROPN', 'NOUN', 'ADJ'] and token.lemma_ not in CUSTOM_STOP_WORDS)]
     return [word for word, freq in Counter(keywords).most_common(15)]
 
-@st.cache_data
-def generate_ai_feedback_langchain(_jd_text, _resume_text, _missing_keywords, llm_model):
-    if not llm_model: return "LLM not configured."
-    prompt_template = """
+def extract_keywords_batch(texts, nlp_model, batch_size=None, n_process=None):
+    """JD keywords (see keywords_from_doc) for many texts, streamed through nlp.pipe in batches of
+    `batch_size` (SPACY_BATCH_SIZE) on `n_process` processes (SPACY_N_PROCESS; more than 1 only
+    pays off for hundreds of long texts). Returns one keyword list per text, in order."""
+    docs = nlp_model.pipe((text.lower() for text in texts), batch_size=batch_size or get_setting("SPACY_BATCH_SIZE", 64),
+                          n_process=n_process or get_setting("SPACY_N_PROCESS", 1))
+    return [keywords_from_doc(doc) for doc in docs]
+
+def analyze_job_description(jd_text, nlp_model, embedding_backend):
+    """Computes the per-job analysis stored on the jobs table: JD keywords and a normalized float32 embedding."""
+    return analyze_job_descriptions([jd_text], nlp_model, embedding_backend)[0]
+
+def analyze_job_descriptions(jd_texts, nlp_model, embedding_backend):
+    """analyze_job_description for many JDs with one nlp.pipe pass and one batched encode.
+    Returns a (jd_keywords, jd_embedding) pair per text."""
+    if not jd_texts:
+        return []
+    return list(zip(extract_keywords_batch(jd_texts, nlp_model), encode_texts(jd_texts, embedding_backend)))
+
+# Part of the feedback cache key: bump whenever the prompt or the model changes so stale
+# responses aren't served for the new prompt. v2: JD and resume are cut to a token budget
+# (core.prompt_budget) before they are sent.
+FEEDBACK_PROMPT_VERSION = "v2/gemini-1.5-flash-latest"
+FEEDBACK_PROMPT_TEMPLATE = """
     You are an expert career coach providing feedback on a resume for a specific job description.
     Your response MUST follow this structure EXACTLY, with each section header on a new line:
 
@@ -45,42 +98,203 @@ def generate_ai_feedback_langchain(_jd_text, _resume_text, _missing_keywords, ll
     **Resume Text:** {resume}
     **Missing Keywords to consider:** {missing_keywords}
     """
-    prompt = ChatPromptTemplate.from_template(prompt_template)
-    parser = StrOutputParser()
-    chain = prompt | llm_model | parser
-    try:
-        return chain.invoke({"missing_keywords": ", ".join(_missing_keywords), "jd": _jd_text, "resume": _resume_text})
-    except Exception as e:
-        return f"Could not generate AI feedback: {e}"
 
-def calculate_hybrid_score(jd_embedding, resume_text, jd_keywords, llm_score, semantic_model_instance):
-    resume_lower = resume_text.lower()
-    matched_keywords = [kw for kw in jd_keywords if kw in resume_lower]
-    hard_score = (len(matched_keywords) / len(jd_keywords)) * 100 if jd_keywords else 0
-    resume_embedding = semantic_model_instance.encode(resume_text, convert_to_tensor=True)
-    soft_score = util.pytorch_cos_sim(jd_embedding, resume_embedding).item() * 100
-    final_score = (0.3 * hard_score) + (0.5 * soft_score) + (0.2 * llm_score)
-    return final_score, hard_score, soft_score
+def _feedback_inputs(jd_text, resume_text, missing_keywords):
+    return {"missing_keywords": ", ".join(missing_keywords), "jd": jd_text, "resume": resume_text}
+
+def feedback_prompt_tokens(jd_text, resume_text, missing_keywords):
+    """Estimated size in tokens of the feedback prompt for these inputs."""
+    return estimate_tokens(FEEDBACK_PROMPT_TEMPLATE.format(**_feedback_inputs(jd_text, resume_text, missing_keywords)))
+
+def _feedback_text(message, inputs):
+    """The text of an LLM response and the call's token counts, {'prompt_tokens', 'response_tokens'}:
+    from the model's usage metadata, estimated from the prompt and response length when the model
+    doesn't report them."""
+    from langchain_core.output_parsers import StrOutputParser
+    text = StrOutputParser().invoke(message)
+    usage = getattr(message, "usage_metadata", None) or {}
+    tokens = {'prompt_tokens': usage.get("input_tokens") or estimate_tokens(FEEDBACK_PROMPT_TEMPLATE.format(**inputs)),
+              'response_tokens': usage.get("output_tokens") or estimate_tokens(text)}
+    observe_llm_tokens(tokens['prompt_tokens'], tokens['response_tokens'])
+    return text, tokens
+
+def request_ai_feedback(jd_text, resume_text, missing_keywords, llm_model):
+    """Calls the LLM for feedback and returns (raw response, token counts); raises if the call fails."""
+    if not llm_model:
+        raise RuntimeError("LLM not configured.")
+    from langchain_core.prompts import ChatPromptTemplate
+    prompt = ChatPromptTemplate.from_template(FEEDBACK_PROMPT_TEMPLATE)
+    chain = prompt | llm_model
+    inputs = _feedback_inputs(jd_text, resume_text, missing_keywords)
+    with observe_llm_call():
+        message = chain.invoke(inputs)
+    return _feedback_text(message, inputs)
+
+_llm_semaphore = None
+
+def _get_llm_semaphore():
+    # Created on first use so it belongs to the running event loop
+    global _llm_semaphore
+    if _llm_semaphore is None:
+        _llm_semaphore = asyncio.Semaphore(get_setting("LLM_MAX_CONCURRENCY", 4))
+    return _llm_semaphore
+
+async def arequest_ai_feedback(jd_text, resume_text, missing_keywords, llm_model):
+    """Async request_ai_feedback via the chain's `ainvoke`; at most LLM_MAX_CONCURRENCY calls run at once."""
+    if not llm_model:
+        raise RuntimeError("LLM not configured.")
+    from langchain_core.prompts import ChatPromptTemplate
+    chain = ChatPromptTemplate.from_template(FEEDBACK_PROMPT_TEMPLATE) | llm_model
+    inputs = _feedback_inputs(jd_text, resume_text, missing_keywords)
+    async with _get_llm_semaphore():
+        with observe_llm_call():
+            message = await chain.ainvoke(inputs)
+    return _feedback_text(message, inputs)
+
+async def acached_ai_feedback(jd_text, resume_text, missing_keywords, llm_model):
+    """arequest_ai_feedback behind the shared feedback cache; failed calls are not cached. Token
+    counts are None when the response came from the cache. Cache lookups and stores run in a
+    thread since they may hit Postgres."""
+    key = feedback_cache_key(FEEDBACK_PROMPT_VERSION, jd_text, resume_text, missing_keywords)
+    raw_feedback = await asyncio.to_thread(feedback_cache.get, key)
+    if raw_feedback is not None:
+        return raw_feedback, None
+    raw_feedback, tokens = await arequest_ai_feedback(jd_text, resume_text, missing_keywords, llm_model)
+    await asyncio.to_thread(feedback_cache.put, key, raw_feedback)
+    return raw_feedback, tokens
+
+def parse_ai_feedback(raw_feedback):
+    """Splits a raw LLM response into (llm_score, verdict, feedback_text)."""
+    llm_score, verdict, ai_feedback_text = 0.0, "N/A", raw_feedback
+    verdict_match = re.search(r"\*\*Verdict:\*\*\s*(.*)", raw_feedback)
+    if verdict_match: verdict = verdict_match.group(1).strip()
+    score_match = re.search(r"\*\*Overall Score:\*\*\s*(\d{1,3})", raw_feedback)
+    if score_match: llm_score = float(score_match.group(1))
+    feedback_match = re.search(r"\*\*Actionable Feedback:\*\*(.*)", raw_feedback, re.DOTALL)
+    if feedback_match: ai_feedback_text = feedback_match.group(1).strip()
+    return llm_score, verdict, ai_feedback_text
+
+def combine_scores(hard_score, soft_score, llm_score, weights=None):
+    """Weighted final score (`weights` defaults to SCORE_WEIGHTS). While the LLM score is still
+    pending (None) the remaining weights are renormalized, giving a provisional score on the same
+    0-100 scale. Works element-wise on NumPy arrays as well as on scalars."""
+    weights = weights or SCORE_WEIGHTS
+    if llm_score is None:
+        weight = (weights['keyword'] + weights['semantic']) or 1.0
+        return (weights['keyword'] * hard_score + weights['semantic'] * soft_score) / weight
+    return (weights['keyword'] * hard_score) + (weights['semantic'] * soft_score) + (weights['llm'] * llm_score)
+
+def encode_texts(texts, embedding_backend, batch_size=32):
+    """Encodes texts in batches into a (len(texts), dim) matrix of L2-normalized float32 rows with the
+    given core.embeddings backend."""
+    return embedding_backend.encode(texts, batch_size)
+
+def semantic_similarity(jd_embedding, resume_embedding):
+    """Cosine similarity on a 0-100 scale between a JD embedding and a normalized resume embedding."""
+    jd_vector = np.asarray(jd_embedding, dtype=np.float32)
+    return float(resume_embedding @ jd_vector / (np.linalg.norm(jd_vector) or 1.0)) * 100
+
+def chunk_similarity(jd_embedding, chunk_embeddings, mode='chunk-max', top_k=None):
+    """Aggregates the cosine similarities (0-100) of a resume's chunk embeddings against the JD: the
+    best chunk for 'chunk-max', the mean of the best `top_k` (default CHUNK_TOP_K) for 'chunk-mean-top-k'."""
+    jd_vector = np.asarray(jd_embedding, dtype=np.float32)
+    similarities = chunk_embeddings @ jd_vector / (np.linalg.norm(jd_vector) or 1.0) * 100
+    if mode == 'chunk-max':
+        return float(similarities.max())
+    if mode != 'chunk-mean-top-k':
+        raise ValueError(f"Unknown SEMANTIC_SCORING {mode!r}; choose one of {', '.join(SEMANTIC_MODES)}.")
+    k = min(top_k or CHUNK_TOP_K, len(similarities))
+    return float(np.partition(similarities, len(similarities) - k)[-k:].mean())
+
+def resume_semantic_score(jd_embedding, resume, mode=None):
+    """Semantic score of a resume dict (resume_embedding, and chunk_embeddings for the chunk modes)
+    under `mode`, which defaults to SEMANTIC_SCORING."""
+    mode = mode or SEMANTIC_SCORING
+    if mode == 'single':
+        return semantic_similarity(jd_embedding, resume['resume_embedding'])
+    return chunk_similarity(jd_embedding, resume['chunk_embeddings'], mode)
+
+# --- Resume Sections ---
+# A line mentioning projects/experience opens the project section; a blank line or an all-caps
+# heading closes it. The same patterns split a resume into sections for chunked embedding.
+PROJECT_SECTION_PATTERN = re.compile(r"(projects|experience)")
+HEADING_PATTERN = re.compile(r"^\s*[A-Z ]{3,}$")
 
 def extract_projects(resume_text):
     projects = []
     lines = resume_text.split("\n")
     capture = False
     for line in lines:
-        if re.search(r"(projects|experience)", line.lower()):
+        if PROJECT_SECTION_PATTERN.search(line.lower()):
             capture = True
             continue
         if capture:
-            if line.strip() == "" or re.match(r"^\s*[A-Z ]{3,}$", line):
+            if line.strip() == "" or HEADING_PATTERN.match(line):
                 capture = False
             else:
                 projects.append(line.strip())
     return projects
 
-def map_projects_to_jd(projects, jd_keywords):
-    mappings = {}
-    for project in projects:
-        matched = [kw for kw in jd_keywords if kw.lower() in project.lower()]
-        if matched:
-            mappings[project] = matched
-    return mappings
\ No newline at end of file
+def is_section_heading(line):
+    """All-caps lines, and short lines naming the projects/experience section, start a new section."""
+    return bool(HEADING_PATTERN.match(line)) or (len(line.split()) <= 4 and bool(PROJECT_SECTION_PATTERN.search(line.lower())))
+
+def split_resume_sections(resume_text):
+    """Splits a resume into (heading, lines) sections; text before the first heading has heading ''."""
+    sections = [("", [])]
+    for line in resume_text.split("\n"):
+        if is_section_heading(line):
+            sections.append((line.strip(), []))
+        elif line.strip():
+            sections[-1][1].append(line.strip())
+    return [(heading, lines) for heading, lines in sections if lines]
+
+def chunk_resume(resume_text, max_words=None, max_chunks=None):
+    """Splits a resume into chunks of at most `max_words` words (CHUNK_WORDS) that never span two
+    sections, each prefixed with its section heading. At most `max_chunks` (CHUNK_MAX_PER_RESUME)
+    are returned; a resume without any text yields one empty chunk."""
+    max_words = max_words or CHUNK_WORDS
+    max_chunks = max_chunks or CHUNK_MAX_PER_RESUME
+    chunks = []
+    for heading, lines in split_resume_sections(resume_text):
+        section_chunks, words = [], []
+        for line in lines:
+            line_words = line.split()
+            if words and len(words) + len(line_words) > max_words:
+                section_chunks.append(words)
+                words = []
+            # A single line longer than a chunk is split on word boundaries
+            while len(line_words) > max_words:
+                section_chunks.append(line_words[:max_words])
+                line_words = line_words[max_words:]
+            words.extend(line_words)
+        if words:
+            section_chunks.append(words)
+        chunks.extend(f"{heading}\n{' '.join(chunk_words)}".strip() for chunk_words in section_chunks)
+        if len(chunks) >= max_chunks:
+            break
+    return chunks[:max_chunks] or [""]
+
+def encode_resumes(resume_texts, embedding_backend, batch_size=32, chunked_texts=()):
+    """Encodes whole resumes and the section chunks of `chunked_texts` in one batched call.
+    Returns (whole-resume matrix, one chunk matrix per text in `chunked_texts`)."""
+    resume_texts = list(resume_texts)
+    chunk_lists = [chunk_resume(text) for text in chunked_texts]
+    texts = resume_texts + [chunk for chunks in chunk_lists for chunk in chunks]
+    if not texts:
+        return np.empty((0, 0), dtype=np.float32), []
+    embeddings = encode_texts(texts, embedding_backend, batch_size)
+    chunk_matrices, offset = [], len(resume_texts)
+    for chunks in chunk_lists:
+        chunk_matrices.append(embeddings[offset:offset + len(chunks)])
+        offset += len(chunks)
+    return embeddings[:len(resume_texts)], chunk_matrices
+
+EMAIL_PATTERN = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+
+def extract_candidate_contact(resume_text, fallback_name):
+    """Best-effort (name, email) from the resume itself, for uploads that come without a form.
+    The name is the first short non-empty line; the email is None if none is found."""
+    email_match = EMAIL_PATTERN.search(resume_text)
+    name = next((line.strip() for line in resume_text.split("\n") if 0 < len(line.strip()) <= 60), fallback_name)
+    return name, email_match.group(0).lower() if email_match else None
@@ -0,0 +1,199 @@
+import contextvars
+import json
+import os
+import random
+import re
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from prometheus_client import Counter, Histogram, REGISTRY, generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from core.config import get_setting
+
+# Metrics live in this process's default registry and are served by /metrics. With several
+# uvicorn workers each worker reports its own series; scrape them individually or aggregate by
+# instance in Prometheus.
+
+# --- Metrics ---
+STAGE_SECONDS = Histogram("resume_stage_seconds", "Duration of one stage of a pipeline (apply, bulk, rescore, feedback).",
+                          ["pipeline", "stage"], buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30))
+DOCUMENT_BYTES = Histogram("resume_document_bytes", "Size of uploaded resume files.",
+                           buckets=(10_000, 50_000, 100_000, 250_000, 500_000, 1_000_000, 2_500_000, 5_000_000, 10_000_000))
+DOCUMENT_PAGES = Histogram("resume_document_pages", "Pages (or DOCX/TXT blocks) extracted per resume.", buckets=(1, 2, 3, 5, 10, 20, 30, 50))
+EXTRACTION_ERRORS = Counter("resume_extraction_errors", "Resumes that could not be extracted, by error code.", ["code"])
+LLM_SECONDS = Histogram("llm_request_seconds", "Duration of LLM feedback calls.", buckets=(0.25, 0.5, 1, 2, 4, 8, 15, 30, 60))
+LLM_REQUESTS = Counter("llm_requests", "LLM feedback calls by outcome.", ["outcome"])
+LLM_TOKENS = Histogram("llm_tokens", "Tokens per LLM feedback call (reported by the model, or estimated).", ["kind"],
+                       buckets=(100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000))
+DB_QUERY_SECONDS = Histogram("db_query_seconds", "Duration of database statements by verb and table.", ["statement"],
+                             buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5))
+DB_QUERY_ERRORS = Counter("db_query_errors", "Database statements that raised, by verb and table.", ["statement"])
+DB_POOL_WAIT_SECONDS = Histogram("db_pool_wait_seconds", "Time spent waiting for a pooled database connection.",
+                                 buckets=(0.0001, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30))
+REQUEST_SECONDS = Histogram("http_request_seconds", "HTTP request duration by route and status.", ["method", "route", "status"],
+                            buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30))
+
+class _StatsCollector:
+    """Exposes statistics kept elsewhere as plain dicts (connection pool, feedback cache, admission
+    gate, ...) as Prometheus counters and gauges, read at scrape time."""
+
+    def __init__(self):
+        self._sources = []
+
+    def add(self, prefix, read, counters=(), gauges=()):
+        self._sources.append((prefix, read, counters, gauges))
+
+    def collect(self):
+        for prefix, read, counters, gauges in self._sources:
+            try:
+                stats = read()
+            except Exception as e:
+                print(f"Could not read {prefix} stats for /metrics: {e}")
+                continue
+            for name in counters:
+                yield CounterMetricFamily(f"{prefix}_{name}", f"{prefix} {name.replace('_', ' ')}", value=stats[name])
+            for name in gauges:
+                yield GaugeMetricFamily(f"{prefix}_{name}", f"{prefix} {name.replace('_', ' ')}", value=stats[name])
+
+_stats_collector = _StatsCollector()
+REGISTRY.register(_stats_collector)
+
+def register_stats(prefix, read, counters=(), gauges=()):
+    """Publishes the given keys of the dict returned by `read()` as `<prefix>_<key>` metrics."""
+    _stats_collector.add(prefix, read, counters, gauges)
+
+def render_metrics():
+    """(body, content type) of the Prometheus text exposition of every metric in this process."""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+# --- Stage Timing ---
+# Per-request trace: {stage: seconds} plus database totals, filled in by timed_stage and the
+# timing cursor. Context variables follow the request into run_in_threadpool calls.
+_current_trace = contextvars.ContextVar('current_trace', default=None)
+
+class StageTimer:
+    seconds = 0.0
+
+def _add_to_trace(key, seconds):
+    trace = _current_trace.get()
+    if trace is not None:
+        trace[key] = trace.get(key, 0.0) + seconds
+
+@contextmanager
+def timed_stage(pipeline, stage):
+    """Records the duration of the block in resume_stage_seconds and the current request's trace.
+    Yields a StageTimer whose `seconds` is set when the block exits."""
+    timer = StageTimer()
+    start = time.perf_counter()
+    try:
+        yield timer
+    finally:
+        timer.seconds = time.perf_counter() - start
+        STAGE_SECONDS.labels(pipeline, stage).observe(timer.seconds)
+        _add_to_trace(stage, timer.seconds)
+
+def observe_document(size_bytes=None, extraction=None):
+    """Records an uploaded file's size and/or the outcome of its extraction (a core.document_processor.ExtractionResult)."""
+    if size_bytes is not None:
+        DOCUMENT_BYTES.observe(size_bytes)
+    if extraction is not None:
+        if extraction.ok:
+            DOCUMENT_PAGES.observe(extraction.pages)
+        else:
+            EXTRACTION_ERRORS.labels(extraction.error_code).inc()
+
+def estimate_tokens(text):
+    # Rough rule for English prose; only used when the model doesn't report usage
+    return max(1, len(text) // 4)
+
+@contextmanager
+def observe_llm_call():
+    """Times an LLM call and counts it as 'ok' or 'error' (the exception propagates)."""
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        LLM_REQUESTS.labels("error").inc()
+        raise
+    else:
+        LLM_REQUESTS.labels("ok").inc()
+    finally:
+        LLM_SECONDS.observe(time.perf_counter() - start)
+
+def observe_llm_tokens(prompt_tokens, response_tokens):
+    LLM_TOKENS.labels("prompt").observe(prompt_tokens)
+    LLM_TOKENS.labels("response").observe(response_tokens)
+
+# --- Database ---
+_TABLE_PATTERN = re.compile(r"\b(?:from|into|update|table|on)\s+(?:if\s+(?:not\s+)?exists\s+)?(?:only\s+)?([a-z_][a-z0-9_]*)",
+                            re.IGNORECASE)
+
+@lru_cache(maxsize=512)
+def _statement_label(head):
+    verb = head.split(None, 1)[0].lower() if head.strip() else "unknown"
+    table = _TABLE_PATTERN.search(head)
+    return f"{verb} {table.group(1).lower()}" if table else verb
+
+def statement_label(query):
+    """Low-cardinality label for a SQL statement: its verb and first table, e.g. 'select applications'."""
+    if isinstance(query, bytes):
+        query = query[:300].decode("utf-8", "replace")
+    else:
+        query = str(query)[:300]
+    return _statement_label(query)
+
+def observe_query(query, seconds, failed=False):
+    label = statement_label(query)
+    DB_QUERY_SECONDS.labels(label).observe(seconds)
+    if failed:
+        DB_QUERY_ERRORS.labels(label).inc()
+    _add_to_trace("db_seconds", seconds)
+    _add_to_trace("db_queries", 1)
+
+def observe_pool_wait(seconds):
+    DB_POOL_WAIT_SECONDS.observe(seconds)
+    _add_to_trace("db_pool_wait_seconds", seconds)
+
+# --- Requests ---
+async def instrument_request(request, call_next):
+    """HTTP middleware: request duration by route, an optional JSON timing line per request
+    (REQUEST_TIMING_LOG=true) with its stage and database times, and an optional sampling profile
+    of a fraction of requests (PROFILE_SAMPLE_RATE, written to PROFILE_DIR; needs pyinstrument)."""
+    trace = {}
+    token = _current_trace.set(trace)
+    profiler = _start_profiler() if random.random() < get_setting("PROFILE_SAMPLE_RATE", 0.0) else None
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        seconds = time.perf_counter() - start
+        _current_trace.reset(token)
+        # The route template ('/apply/{job_id}'), not the raw path, keeps the label set small
+        route = getattr(request.scope.get("route"), "path", "unmatched")
+        REQUEST_SECONDS.labels(request.method, route, str(status)).observe(seconds)
+        if profiler is not None:
+            _save_profile(profiler, request.method, route)
+        if get_setting("REQUEST_TIMING_LOG", False):
+            print(json.dumps({"method": request.method, "route": route, "path": request.url.path, "status": status,
+                              "seconds": round(seconds, 4), **{key: round(value, 4) for key, value in trace.items()}}), flush=True)
+
+def _start_profiler():
+    try:
+        from pyinstrument import Profiler
+    except ImportError:
+        print("PROFILE_SAMPLE_RATE is set but pyinstrument is not installed; not profiling.")
+        return None
+    profiler = Profiler(async_mode="enabled")
+    profiler.start()
+    return profiler
+
+def _save_profile(profiler, method, route):
+    profiler.stop()
+    directory = get_setting("PROFILE_DIR", "data/profiles")
+    os.makedirs(directory, exist_ok=True)
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{random.getrandbits(32):08x}-{method}{re.sub(r'[^A-Za-z0-9]+', '_', route)}-{os.getpid()}.txt"
+    with open(os.path.join(directory, name), "w") as f:
+        f.write(profiler.output_text())
@@ -0,0 +1,339 @@
+import psycopg2.extras
+import ast
+import hashlib
+from core.database import transaction
+from core.keyword_matcher import skill_terms
+
+# Schema changes are applied by `python -m core.migrations` (or at API startup with AUTO_MIGRATE=true),
+# never as a side effect of importing the app. Each migration runs once, in order, and is recorded
+# in schema_migrations; add new ones to the end of MIGRATIONS.
+
+def _initial_schema(cursor):
+    """Tables as of the first versioned schema. Written to be idempotent so it also upgrades databases
+    that were created by the old import-time init_db()."""
+    # Use SERIAL PRIMARY KEY for auto-incrementing in PostgreSQL
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS jobs (
+            id SERIAL PRIMARY KEY,
+            timestamp TIMESTAMPTZ NOT NULL,
+            title TEXT NOT NULL,
+            description TEXT NOT NULL,
+            jd_keywords TEXT[],
+            jd_embedding BYTEA,
+            analysis_version TEXT
+        )
+    """)
+    # Databases created before the JD analysis was persisted need the new columns added in place
+    cursor.execute("ALTER TABLE jobs ADD COLUMN IF NOT EXISTS jd_keywords TEXT[]")
+    cursor.execute("ALTER TABLE jobs ADD COLUMN IF NOT EXISTS jd_embedding BYTEA")
+    cursor.execute("ALTER TABLE jobs ADD COLUMN IF NOT EXISTS analysis_version TEXT")
+    # Per-job weights of the keyword/semantic/LLM components of final_score
+    cursor.execute("ALTER TABLE jobs ADD COLUMN IF NOT EXISTS weight_keyword REAL NOT NULL DEFAULT 0.3")
+    cursor.execute("ALTER TABLE jobs ADD COLUMN IF NOT EXISTS weight_semantic REAL NOT NULL DEFAULT 0.5")
+    cursor.execute("ALTER TABLE jobs ADD COLUMN IF NOT EXISTS weight_llm REAL NOT NULL DEFAULT 0.2")
+    # Each distinct uploaded file is parsed and embedded once; applications reference it by id
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS resumes (
+            id SERIAL PRIMARY KEY,
+            sha256 TEXT NOT NULL UNIQUE,
+            resume_text TEXT NOT NULL,
+            projects JSONB NOT NULL DEFAULT '[]',
+            resume_embedding BYTEA,
+            embedding_model TEXT,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS applications (
+            id SERIAL PRIMARY KEY,
+            job_id INTEGER NOT NULL,
+            timestamp TIMESTAMPTZ NOT NULL,
+            candidate_name TEXT NOT NULL,
+            candidate_email TEXT NOT NULL,
+            final_score REAL,
+            semantic_score REAL,
+            keyword_score REAL,
+            llm_score REAL,
+            ai_feedback TEXT,
+            verdict TEXT,
+            status TEXT DEFAULT 'Applied',
+            resume_id INTEGER REFERENCES resumes (id),
+            project_mappings JSONB,
+            missing_keywords TEXT,
+            FOREIGN KEY (job_id) REFERENCES jobs (id) ON DELETE CASCADE,
+            UNIQUE(job_id, candidate_email)
+        )
+    """)
+    # LLM feedback is filled in asynchronously
+    cursor.execute("ALTER TABLE applications ADD COLUMN IF NOT EXISTS feedback_status TEXT NOT NULL DEFAULT 'complete'")
+    cursor.execute("ALTER TABLE applications ADD COLUMN IF NOT EXISTS resume_id INTEGER REFERENCES resumes (id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS applications_resume_idx ON applications (resume_id)")
+    _move_resumes_out_of_applications(cursor)
+    # Keyset pagination of a job's ranked applications, and the student status lookup
+    cursor.execute("CREATE INDEX IF NOT EXISTS applications_job_score_idx ON applications (job_id, final_score DESC, id DESC)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS applications_email_idx ON applications (candidate_email)")
+    # Work queue drained by core.feedback_worker; finished jobs are deleted so it stays small
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS feedback_jobs (
+            id SERIAL PRIMARY KEY,
+            application_id INTEGER NOT NULL UNIQUE REFERENCES applications (id) ON DELETE CASCADE,
+            status TEXT NOT NULL DEFAULT 'queued',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            available_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            locked_at TIMESTAMPTZ,
+            last_error TEXT,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS feedback_jobs_ready_idx ON feedback_jobs (available_at) WHERE status = 'queued'")
+    # Shared tier of core.feedback_cache, keyed by a content hash of the prompt inputs
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS llm_feedback_cache (
+            cache_key TEXT PRIMARY KEY,
+            feedback TEXT NOT NULL,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS llm_feedback_cache_created_idx ON llm_feedback_cache (created_at)")
+
+def _column_type(cursor, table, column):
+    cursor.execute("SELECT data_type FROM information_schema.columns WHERE table_name = %s AND column_name = %s", (table, column))
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+def _parse_legacy_literal(value, default):
+    """Reads back a value that older versions stored with str() instead of as JSON."""
+    try:
+        return ast.literal_eval(value) if value else default
+    except (ValueError, SyntaxError):
+        return default
+
+def _move_resumes_out_of_applications(cursor):
+    """Migrates databases from before the resumes table, where every application carried its own
+    resume text, embedding and str()-encoded projects, and project_mappings was a str()'d dict.
+    The original schema stored the projects but never the resume text, so its applications keep
+    resume_id NULL; rescoring keeps their stored component scores."""
+    if _column_type(cursor, 'applications', 'resume_text') is not None:
+        cursor.execute("SELECT id, resume_text, resume_embedding, projects FROM applications WHERE resume_id IS NULL")
+        legacy = cursor.fetchall()
+        if legacy:
+            # The original file bytes are gone, so legacy rows are keyed by a hash of their text under
+            # a prefix no file hash can collide with. The embedding model wasn't recorded either; it is
+            # left unknown so the embedding is recomputed on next use.
+            resumes, application_hashes = {}, []
+            for application_id, resume_text, resume_embedding, projects in legacy:
+                sha = "text:" + hashlib.sha256((resume_text or "").encode("utf-8")).hexdigest()
+                resumes.setdefault(sha, (sha, resume_text or "", psycopg2.extras.Json(_parse_legacy_literal(projects, [])), resume_embedding))
+                application_hashes.append((application_id, sha))
+            resume_ids = dict(psycopg2.extras.execute_values(cursor, """
+                INSERT INTO resumes (sha256, resume_text, projects, resume_embedding) VALUES %s
+                ON CONFLICT (sha256) DO UPDATE SET sha256 = EXCLUDED.sha256
+                RETURNING sha256, id
+            """, list(resumes.values()), fetch=True))
+            psycopg2.extras.execute_values(cursor, """
+                UPDATE applications AS a SET resume_id = v.resume_id FROM (VALUES %s) AS v (id, resume_id) WHERE a.id = v.id
+            """, [(application_id, resume_ids[sha]) for application_id, sha in application_hashes])
+        cursor.execute("ALTER TABLE applications DROP COLUMN resume_text, DROP COLUMN IF EXISTS resume_embedding, DROP COLUMN IF EXISTS projects")
+    elif _column_type(cursor, 'applications', 'projects') is not None:
+        # Never read back; the matched projects are in project_mappings
+        cursor.execute("ALTER TABLE applications DROP COLUMN projects")
+    if _column_type(cursor, 'applications', 'project_mappings') == 'text':
+        cursor.execute("SELECT id, project_mappings FROM applications WHERE project_mappings IS NOT NULL")
+        mappings = [(application_id, psycopg2.extras.Json(_parse_legacy_literal(value, {}))) for application_id, value in cursor.fetchall()]
+        cursor.execute("ALTER TABLE applications ALTER COLUMN project_mappings TYPE JSONB USING NULL")
+        psycopg2.extras.execute_values(cursor, """
+            UPDATE applications AS a SET project_mappings = v.project_mappings FROM (VALUES %s) AS v (id, project_mappings) WHERE a.id = v.id
+        """, mappings, template="(%s::int, %s::jsonb)")
+
+def _resume_chunk_embeddings(cursor):
+    """Per-resume cache of section-chunk embeddings for the chunked semantic scoring modes: the
+    chunk_count rows of the matrix as raw float32 bytes, tagged like resume_embedding."""
+    cursor.execute("ALTER TABLE resumes ADD COLUMN IF NOT EXISTS chunk_embeddings BYTEA")
+    cursor.execute("ALTER TABLE resumes ADD COLUMN IF NOT EXISTS chunk_count INTEGER")
+    cursor.execute("ALTER TABLE resumes ADD COLUMN IF NOT EXISTS chunk_version TEXT")
+
+def _feedback_token_counts(cursor):
+    """Token counts of each application's feedback call: what was sent and returned, and how large
+    the prompt would have been before the token budget. NULL prompt/response counts mean the
+    feedback was served from the cache."""
+    cursor.execute("ALTER TABLE applications ADD COLUMN IF NOT EXISTS prompt_tokens INTEGER")
+    cursor.execute("ALTER TABLE applications ADD COLUMN IF NOT EXISTS response_tokens INTEGER")
+    cursor.execute("ALTER TABLE applications ADD COLUMN IF NOT EXISTS untrimmed_prompt_tokens INTEGER")
+
+def _job_stats(cursor):
+    """missing_keywords becomes a TEXT[], and per-job aggregates are kept up to date by triggers:
+    application counts by score bucket and status, and how many applications miss each JD keyword.
+    A job's stats are then a read of at most a few hundred rows, whatever its number of applications."""
+    cursor.execute("ALTER TABLE applications ALTER COLUMN missing_keywords DROP DEFAULT")
+    cursor.execute("""
+        ALTER TABLE applications ALTER COLUMN missing_keywords TYPE TEXT[]
+        USING CASE WHEN missing_keywords IS NULL OR missing_keywords = '' THEN '{}'::TEXT[] ELSE string_to_array(missing_keywords, ', ') END
+    """)
+    cursor.execute("ALTER TABLE applications ALTER COLUMN missing_keywords SET DEFAULT '{}'")
+    # Bucket b holds final scores in [b, b + 1); -1 collects negative scores and 100 everything from 100 up,
+    # so "score >= t" is exactly "bucket >= t" for integer thresholds 0-100
+    cursor.execute("""
+        CREATE OR REPLACE FUNCTION score_bucket(score REAL) RETURNS SMALLINT
+        LANGUAGE sql IMMUTABLE AS $$ SELECT LEAST(GREATEST(floor(COALESCE(score, 0)), -1), 100)::SMALLINT $$
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS job_score_buckets (
+            job_id INTEGER NOT NULL REFERENCES jobs (id) ON DELETE CASCADE,
+            bucket SMALLINT NOT NULL,
+            status TEXT NOT NULL,
+            applications INTEGER NOT NULL,
+            PRIMARY KEY (job_id, bucket, status)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS job_keyword_gaps (
+            job_id INTEGER NOT NULL REFERENCES jobs (id) ON DELETE CASCADE,
+            keyword TEXT NOT NULL,
+            applications INTEGER NOT NULL,
+            PRIMARY KEY (job_id, keyword)
+        )
+    """)
+    # Statement-level triggers see all rows changed by one statement (a bulk insert, a rescore, a
+    # shortlist) as transition tables and apply their net effect with one upsert per table. Rows of
+    # a job deleted in the same statement are skipped (its aggregates go with it by cascade).
+    cursor.execute("""
+        CREATE OR REPLACE FUNCTION maintain_job_stats() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        DECLARE
+            changes TEXT;
+        BEGIN
+            changes := CASE TG_OP
+                WHEN 'INSERT' THEN 'SELECT job_id, final_score, status, missing_keywords, 1 AS delta FROM new_rows'
+                WHEN 'DELETE' THEN 'SELECT job_id, final_score, status, missing_keywords, -1 AS delta FROM old_rows'
+                ELSE 'SELECT job_id, final_score, status, missing_keywords, 1 AS delta FROM new_rows
+                      UNION ALL SELECT job_id, final_score, status, missing_keywords, -1 FROM old_rows'
+            END;
+            EXECUTE format($sql$
+                INSERT INTO job_score_buckets AS b (job_id, bucket, status, applications)
+                SELECT c.job_id, score_bucket(c.final_score), COALESCE(c.status, 'Applied'), SUM(c.delta)
+                FROM (%s) AS c JOIN jobs j ON j.id = c.job_id
+                GROUP BY 1, 2, 3 HAVING SUM(c.delta) <> 0
+                ORDER BY 1, 2, 3
+                ON CONFLICT (job_id, bucket, status) DO UPDATE SET applications = b.applications + EXCLUDED.applications
+            $sql$, changes);
+            EXECUTE format($sql$
+                INSERT INTO job_keyword_gaps AS g (job_id, keyword, applications)
+                SELECT c.job_id, k.keyword, SUM(c.delta)
+                FROM (%s) AS c JOIN jobs j ON j.id = c.job_id CROSS JOIN LATERAL unnest(c.missing_keywords) AS k (keyword)
+                GROUP BY 1, 2 HAVING SUM(c.delta) <> 0
+                ORDER BY 1, 2
+                ON CONFLICT (job_id, keyword) DO UPDATE SET applications = g.applications + EXCLUDED.applications
+            $sql$, changes);
+            -- Keep the tables small: a count that dropped to zero is removed
+            IF TG_OP <> 'INSERT' THEN
+                DELETE FROM job_score_buckets WHERE applications = 0 AND job_id IN (SELECT job_id FROM old_rows);
+                DELETE FROM job_keyword_gaps WHERE applications = 0 AND job_id IN (SELECT job_id FROM old_rows);
+            END IF;
+            RETURN NULL;
+        END
+        $$
+    """)
+    cursor.execute("""
+        CREATE TRIGGER applications_stats_insert AFTER INSERT ON applications
+        REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION maintain_job_stats()
+    """)
+    cursor.execute("""
+        CREATE TRIGGER applications_stats_update AFTER UPDATE ON applications
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION maintain_job_stats()
+    """)
+    cursor.execute("""
+        CREATE TRIGGER applications_stats_delete AFTER DELETE ON applications
+        REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION maintain_job_stats()
+    """)
+    # Backfill from the applications already stored
+    cursor.execute("""
+        INSERT INTO job_score_buckets (job_id, bucket, status, applications)
+        SELECT job_id, score_bucket(final_score), COALESCE(status, 'Applied'), count(*) FROM applications GROUP BY 1, 2, 3
+    """)
+    cursor.execute("""
+        INSERT INTO job_keyword_gaps (job_id, keyword, applications)
+        SELECT job_id, keyword, count(*) FROM applications CROSS JOIN LATERAL unnest(missing_keywords) AS k (keyword) GROUP BY 1, 2
+    """)
+
+def _resume_search(cursor):
+    """Search across all applications: each resume's text as a tsvector and its distinct normalized
+    terms as a TEXT[] (the skills filter), both GIN indexed, plus a score index for unfiltered
+    listings. Existing resumes get their terms backfilled here; new ones get them in upsert_resumes."""
+    cursor.execute("""
+        ALTER TABLE resumes ADD COLUMN IF NOT EXISTS search_vector tsvector
+            GENERATED ALWAYS AS (to_tsvector('english', resume_text)) STORED
+    """)
+    cursor.execute("ALTER TABLE resumes ADD COLUMN IF NOT EXISTS skills TEXT[] NOT NULL DEFAULT '{}'")
+    _backfill_resume_skills(cursor)
+    cursor.execute("CREATE INDEX IF NOT EXISTS resumes_search_vector_idx ON resumes USING GIN (search_vector)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS resumes_skills_idx ON resumes USING GIN (skills)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS applications_score_idx ON applications (final_score DESC, id DESC)")
+
+def _backfill_resume_skills(cursor):
+    """Recomputes the skills of every stored resume with core.keyword_matcher.skill_terms."""
+    with cursor.connection.cursor(name="resume_terms_backfill") as stream:
+        stream.itersize = 1000
+        stream.execute("SELECT id, resume_text FROM resumes")
+        while True:
+            rows = stream.fetchmany(1000)
+            if not rows:
+                break
+            psycopg2.extras.execute_values(cursor, """
+                UPDATE resumes AS r SET skills = v.skills FROM (VALUES %s) AS v (id, skills) WHERE r.id = v.id
+            """, [(resume_id, skill_terms(resume_text)) for resume_id, resume_text in rows], template="(%s::int, %s::text[])", page_size=1000)
+
+def _resume_skill_terms(cursor):
+    """Skills stored by version 5 kept stop words and folded node.js to node.j; recompute them."""
+    # Rewrites every resume row; on a large table VACUUM FULL resumes afterwards to drop the old versions
+    _backfill_resume_skills(cursor)
+
+MIGRATIONS = [
+    (1, "initial schema", _initial_schema),
+    (2, "resume chunk embeddings", _resume_chunk_embeddings),
+    (3, "feedback token counts", _feedback_token_counts),
+    (4, "missing keywords array and per-job stats", _job_stats),
+    (5, "resume full-text and skill search", _resume_search),
+    (6, "resume skills without stop words", _resume_skill_terms),
+]
+LATEST_SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+# Arbitrary application-wide key so concurrent migrators (e.g. several workers with AUTO_MIGRATE) take turns
+_MIGRATION_LOCK_KEY = 727_001
+
+def get_schema_version():
+    """Highest applied migration, or 0 for a database that was never migrated."""
+    with transaction() as cursor:
+        cursor.execute("SELECT to_regclass('schema_migrations') IS NOT NULL")
+        if not cursor.fetchone()[0]:
+            return 0
+        cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_migrations")
+        return cursor.fetchone()[0]
+
+def migrate():
+    """Applies all pending migrations in one transaction and returns the versions applied."""
+    with transaction() as cursor:
+        cursor.execute("SELECT pg_advisory_xact_lock(%s)", (_MIGRATION_LOCK_KEY,))
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER PRIMARY KEY,
+                description TEXT NOT NULL,
+                applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+            )
+        """)
+        cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_migrations")
+        current = cursor.fetchone()[0]
+        applied = []
+        for version, description, apply in MIGRATIONS:
+            if version <= current:
+                continue
+            apply(cursor)
+            cursor.execute("INSERT INTO schema_migrations (version, description) VALUES (%s, %s)", (version, description))
+            applied.append(version)
+    return applied
+
+if __name__ == "__main__":
+    applied = migrate()
+    if applied:
+        print(f"Applied migration(s) {', '.join(map(str, applied))}; schema is at version {LATEST_SCHEMA_VERSION}.")
+    else:
+        print(f"Schema is up to date (version {LATEST_SCHEMA_VERSION}).")
@@ -0,0 +1,67 @@
+import threading
+import time
+
+class LazyModel:
+    """A model loaded on first use, once even under concurrent callers; failed loads are retried."""
+
+    def __init__(self, name, loader):
+        self.name = name
+        self.loader = loader
+        self.load_seconds = None
+        self._value = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._loaded
+
+    def get(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    start = time.perf_counter()
+                    self._value = self.loader()
+                    self.load_seconds = time.perf_counter() - start
+                    self._loaded = True
+        return self._value
+
+class WarmUp:
+    """Runs named startup tasks in a background thread; status() reports each as 'ready', 'pending' or 'failed: <error>'."""
+
+    def __init__(self, tasks):
+        self.tasks = list(tasks)
+        self._done = set()
+        self._errors = {}
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            if self.ready:
+                return
+            self._thread = threading.Thread(target=self._run, name="warm-up", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        for name, task in self.tasks:
+            if name in self._done:
+                continue
+            try:
+                task()
+            except Exception as e:
+                print(f"Warm-up of {name} failed: {e}")
+                self._errors[name] = str(e)
+            else:
+                self._errors.pop(name, None)
+                self._done.add(name)
+
+    @property
+    def ready(self):
+        return len(self._done) == len(self.tasks)
+
+    def status(self):
+        return {name: 'ready' if name in self._done else f"failed: {self._errors[name]}" if name in self._errors else 'pending'
+                for name, _ in self.tasks}
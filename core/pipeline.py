@@ -0,0 +1,87 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from core.config import get_setting
+from core.document_processor import ExtractionPool
+from core.keyword_matcher import get_keyword_matcher
+from core.llm_analyzer import extract_projects
+
+# --- Process Pool ---
+_process_pool = None
+_process_pool_lock = threading.Lock()
+
+def get_process_pool():
+    """Process pool for CPU-bound text analysis, created on first use."""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            # spawn rather than fork: the API process already runs torch and DB pool threads
+            _process_pool = ProcessPoolExecutor(max_workers=get_setting("PARSE_WORKERS", os.cpu_count() or 2),
+                                                 mp_context=multiprocessing.get_context("spawn"))
+    return _process_pool
+
+async def run_in_process_pool(func, *args):
+    """Awaits `func(*args)` on the process pool without blocking the event loop."""
+    return await asyncio.wrap_future(get_process_pool().submit(func, *args))
+
+def analyze_resume(resume_text, jd_keywords, projects=None):
+    """Process-pool entry point of /apply: project extraction (unless the stored resume already has
+    its projects) and keyword matching."""
+    if projects is None:
+        projects = extract_projects(resume_text)
+    match = get_keyword_matcher(jd_keywords).scan(resume_text, projects)
+    return {
+        'projects': projects,
+        'project_mappings': match.project_matches,
+        'missing_keywords': match.missing,
+        'keyword_score': match.score,
+    }
+
+# --- Document Extraction ---
+_extraction_pool = None
+
+def get_extraction_pool():
+    """Killable document extraction workers with the PARSE_* budgets, created on first use."""
+    global _extraction_pool
+    with _process_pool_lock:
+        if _extraction_pool is None:
+            _extraction_pool = ExtractionPool(get_setting("PARSE_WORKERS", os.cpu_count() or 2),
+                                              timeout=get_setting("PARSE_TIMEOUT_SECONDS", 30.0),
+                                              max_pages=get_setting("PARSE_MAX_PAGES", 30),
+                                              max_chars=get_setting("PARSE_MAX_CHARS", 200_000),
+                                              max_bytes=get_setting("PARSE_MAX_BYTES", 10 * 1024 * 1024),
+                                              time_budget=get_setting("PARSE_TIME_BUDGET_SECONDS", 10.0))
+    return _extraction_pool
+
+def shutdown_pools():
+    global _process_pool, _extraction_pool
+    with _process_pool_lock:
+        if _process_pool is not None:
+            _process_pool.shutdown(cancel_futures=True)
+        if _extraction_pool is not None:
+            _extraction_pool.close()
+        _process_pool = _extraction_pool = None
+
+# --- Admission Control ---
+class AdmissionGate:
+    """Caps how many requests may be inside an expensive pipeline at once; the rest are turned away."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.in_flight = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def try_enter(self):
+        with self._lock:
+            if self.in_flight >= self.limit:
+                self.rejected += 1
+                return False
+            self.in_flight += 1
+            return True
+
+    def leave(self):
+        with self._lock:
+            self.in_flight -= 1
@@ -0,0 +1,146 @@
+import re
+from collections import Counter
+import numpy as np
+from core.config import get_setting
+from core.keyword_matcher import get_keyword_matcher
+from core.llm_analyzer import split_resume_sections, encode_texts, CHUNK_WORDS
+from core.metrics import estimate_tokens
+
+# The LLM feedback prompt gets the JD and the resume after three cuts: whitespace and extraction
+# artifacts are normalized, boilerplate lines are dropped, and a resume still over its token
+# budget keeps only its sections most relevant to the JD. Token counts are core.metrics
+# estimates (the model's tokenizer isn't available locally), so the caps are approximate.
+
+# --- Normalization ---
+_INVISIBLE = str.maketrans({"\u00ad": None, "\u200b": None, "\u200c": None, "\u200d": None, "\ufeff": None, "\u00a0": " "})
+_CONTROL_CHARS = re.compile(r"[\x00-\x08\x0b-\x1f\x7f]")
+_HYPHENATED_BREAK = re.compile(r"(\w)-\n(\w)")
+_SPACES = re.compile(r"[ \t\f\v\r]+")
+_BLANK_LINES = re.compile(r"\n{3,}")
+
+def normalize_text(text):
+    """Undoes common PDF extraction artifacts: invisible characters, control characters, words
+    hyphenated across line breaks, runs of spaces and stacks of blank lines."""
+    text = _CONTROL_CHARS.sub(" ", text.translate(_INVISIBLE).replace("\r\n", "\n"))
+    text = _HYPHENATED_BREAK.sub(r"\1\2", text)
+    text = "\n".join(_SPACES.sub(" ", line).strip() for line in text.split("\n"))
+    return _BLANK_LINES.sub("\n\n", text).strip()
+
+# Page numbers, separator rules and stock phrases that carry nothing for the feedback
+BOILERPLATE_PATTERNS = [
+    re.compile(r"^(page\s*)?\d{1,3}(\s*(of|/)\s*\d{1,3})?$", re.IGNORECASE),
+    re.compile(r"^(references|referees)\s+(are\s+)?(available\s+)?(up)?on\s+request\.?$", re.IGNORECASE),
+    re.compile(r"^(curriculum vitae|resume|résumé|cv)$", re.IGNORECASE),
+    re.compile(r"^[^\w]+$"),
+]
+# A line repeated this often is a running header or footer; only its first occurrence is kept
+REPEATED_LINE_LIMIT = 3
+
+def drop_boilerplate(text):
+    """Removes boilerplate lines and repeated page headers/footers from normalized text."""
+    lines = text.split("\n")
+    counts = Counter(line.lower() for line in lines if line)
+    kept, seen = [], set()
+    for line in lines:
+        key = line.lower()
+        if line and any(pattern.match(line) for pattern in BOILERPLATE_PATTERNS):
+            continue
+        if line and counts[key] >= REPEATED_LINE_LIMIT:
+            if key in seen:
+                continue
+            seen.add(key)
+        kept.append(line)
+    return _BLANK_LINES.sub("\n\n", "\n".join(kept)).strip()
+
+def clean_text(text):
+    return drop_boilerplate(normalize_text(text or ""))
+
+# --- Relevance Selection ---
+def _section_units(text, max_words):
+    """Splits text into (section_index, heading, lines) units of at most about `max_words` words,
+    never spanning two sections. A single line is never split."""
+    units = []
+    for index, (heading, lines) in enumerate(split_resume_sections(text)):
+        unit, words = [], 0
+        for line in lines:
+            line_words = len(line.split())
+            if unit and words + line_words > max_words:
+                units.append((index, heading, unit))
+                unit, words = [], 0
+            unit.append(line)
+            words += line_words
+        if unit:
+            units.append((index, heading, unit))
+    return units
+
+def _render_units(units):
+    """Joins units back into text in document order, each section heading written once."""
+    parts, last_section = [], None
+    for index, heading, lines in sorted(units, key=lambda unit: unit[0]):
+        if index != last_section and heading:
+            parts.append(heading)
+        parts.extend(lines)
+        last_section = index
+    return "\n".join(parts)
+
+def relevance_scores(unit_texts, jd_keywords, jd_embedding=None, embedding_backend=None, keyword_weight=None):
+    """Scores text units against the JD: the share of JD keywords each contains and, when a JD
+    embedding and backend are given, its cosine similarity to the JD. Each signal is scaled to
+    0-1 by its best unit and the two are mixed by `keyword_weight` (PROMPT_KEYWORD_WEIGHT)."""
+    matcher = get_keyword_matcher(jd_keywords or [])
+    keyword = np.array([matcher.scan(text).score for text in unit_texts], dtype=np.float32)
+    if jd_embedding is None or embedding_backend is None:
+        return keyword
+    keyword_weight = get_setting("PROMPT_KEYWORD_WEIGHT", 0.5) if keyword_weight is None else keyword_weight
+    similarity = np.clip(encode_texts(unit_texts, embedding_backend) @ np.asarray(jd_embedding, dtype=np.float32), 0.0, None)
+    keyword = keyword / keyword.max() if keyword.max() > 0 else keyword
+    similarity = similarity / similarity.max() if similarity.max() > 0 else similarity
+    return keyword_weight * keyword + (1 - keyword_weight) * similarity
+
+def select_relevant_sections(text, max_tokens, jd_keywords, jd_embedding=None, embedding_backend=None):
+    """Cuts text down to about `max_tokens` tokens by keeping its most JD-relevant section units
+    (see relevance_scores), in their original order. Text within the budget is returned as is."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    units = _section_units(text, CHUNK_WORDS)
+    if not units:
+        return text
+    scores = relevance_scores([f"{heading}\n" + "\n".join(lines) for _, heading, lines in units], jd_keywords, jd_embedding, embedding_backend)
+    selected, used, headed = [], 0, set()
+    # Best first; ties keep document order
+    for position in sorted(range(len(units)), key=lambda i: (-scores[i], i)):
+        index, heading, lines = units[position]
+        cost = estimate_tokens("\n".join(lines)) + (estimate_tokens(heading) if heading and index not in headed else 0)
+        if used + cost > max_tokens:
+            continue
+        selected.append(units[position])
+        headed.add(index)
+        used += cost
+    return _render_units(selected) if selected else _truncate(text, max_tokens)
+
+def _truncate(text, max_tokens):
+    """The lines of text that fit in `max_tokens`, from the start; a first line longer than the
+    budget is cut on a word boundary."""
+    kept, used = [], 0
+    for line in text.split("\n"):
+        cost = estimate_tokens(line)
+        if used + cost > max_tokens:
+            if not kept:
+                kept.append(line[:max_tokens * 4].rsplit(" ", 1)[0])
+            break
+        kept.append(line)
+        used += cost
+    return "\n".join(kept)
+
+# --- Feedback Prompt ---
+def budget_feedback_inputs(jd_text, resume_text, jd_keywords, jd_embedding=None, embedding_backend=None,
+                           resume_max_tokens=None, jd_max_tokens=None):
+    """The cleaned JD and resume text for the feedback prompt, as (jd_text, resume_text), each cut to its
+    token budget (the resume by relevance to the JD)."""
+    resume_max_tokens = resume_max_tokens or get_setting("PROMPT_RESUME_MAX_TOKENS", 1500)
+    jd_max_tokens = jd_max_tokens or get_setting("PROMPT_JD_MAX_TOKENS", 1000)
+    jd_text = clean_text(jd_text)
+    if estimate_tokens(jd_text) > jd_max_tokens:
+        jd_text = _truncate(jd_text, jd_max_tokens)
+    resume_text = select_relevant_sections(clean_text(resume_text), resume_max_tokens, jd_keywords, jd_embedding, embedding_backend)
+    return jd_text, resume_text
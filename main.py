@@ -1,32 +1,106 @@
 import os
 os.environ["TRANSFORMERS_OFFLINE"] = "1"
 
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException
-from pydantic import BaseModel
-import re
-import io
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel, Field
+from typing import List, Optional
+import numpy as np
+import tempfile
+import time
 
 # Import your existing logic from the 'core' folder
-from core.database import init_db, add_job, get_all_jobs, add_application, get_applications_for_job, get_student_applications, shortlist_candidates, update_candidate_status, delete_job
-from core.document_processor import read_pdf, read_docx, read_txt
-from core.llm_analyzer import load_spacy_model, load_transformer_model, improved_extract_keywords, generate_ai_feedback_langchain, calculate_hybrid_score, extract_projects, map_projects_to_jd
-from langchain_google_genai import ChatGoogleGenerativeAI
-import streamlit as st # Used to access secrets
+from core.database import (
+    add_job, get_all_jobs, add_application, add_applications_bulk, get_applications_for_job,
+    get_student_applications, shortlist_candidates, preview_shortlist, get_job_stats, update_candidate_status,
+    update_candidate_statuses, get_dashboard, search_applications, delete_job, get_job_analysis,
+    update_job_analysis, get_stale_jobs, update_job_analyses, get_pool_stats, get_feedback_token_stats,
+    transaction, enqueue_feedback_job, iter_resume_embeddings, get_candidates_for_resumes,
+    get_applicant_emails, update_job_description, update_job_weights, get_applications_for_rescoring,
+    update_application_scores, update_resume_embeddings, enqueue_feedback_jobs, get_resumes_by_hash,
+    upsert_resumes, update_resume_chunk_embeddings
+)
+from core.document_processor import spool_to_tempfile, unpack_resume_archive, DocumentTooLarge
+from core.llm_analyzer import (
+    load_spacy_model, load_llm_model, extract_projects, analyze_job_description, analyze_job_descriptions,
+    JD_ANALYSIS_VERSION, combine_scores, extract_candidate_contact, encode_resumes, resume_semantic_score,
+    SEMANTIC_SCORING, CHUNK_VERSION
+)
+from core.embeddings import load_embedding_backend, EMBEDDING_VERSION
+from core.feedback_worker import FeedbackWorkerPool
+from core.feedback_cache import feedback_cache
+from core.candidate_index import CandidateIndex
+from core.keyword_matcher import get_keyword_matcher
+from core.config import get_setting
+from core.pipeline import run_in_process_pool, analyze_resume, get_extraction_pool, shutdown_pools, AdmissionGate
+from core.models import LazyModel, WarmUp
+from core.migrations import get_schema_version, migrate, LATEST_SCHEMA_VERSION
+from core.metrics import instrument_request, render_metrics, register_stats, timed_stage, observe_document
 
-# --- Initialize App and Load Models ---
+# --- Initialize App and Models ---
 app = FastAPI(title="Resume Analyzer API")
+# Request durations for /metrics, plus optional per-request timing lines and sampled profiles
+app.middleware("http")(instrument_request)
 
-nlp = load_spacy_model()
-semantic_model = load_transformer_model()
-try:
-    llm = ChatGoogleGenerativeAI(model="gemini-1.5-flash-latest", google_api_key=st.secrets["GOOGLE_API_KEY"],
-                                 convert_system_message_to_human=True)
-except Exception as e:
-    print(f"Error loading LLM: {e}")
-    llm = None
+# Models are loaded on first use (or by the background warm-up below), not at import time, so a
+# worker starts answering /healthz immediately and light endpoints never pay for torch or spaCy
+nlp = LazyModel("spacy", load_spacy_model)
+semantic_model = LazyModel("embedding_backend", load_embedding_backend)
+llm = LazyModel("llm", load_llm_model)
 
-# Initialize the database on startup
-init_db()
+# LLM feedback is generated in the background; set FEEDBACK_WORKERS_IN_API=false to run the
+# workers only as separate `python -m core.feedback_worker` processes
+feedback_workers = FeedbackWorkerPool(llm, embedding_backend=semantic_model)
+
+# Stored resume embeddings, memory-mapped for cross-job candidate recommendations
+candidate_index = CandidateIndex(get_setting("CANDIDATE_INDEX_DIR", "data/index"), EMBEDDING_VERSION,
+                                 lambda: iter_resume_embeddings(EMBEDDING_VERSION))
+
+warm_up = WarmUp([("spacy", nlp.get), ("embedding_backend", semantic_model.get), ("llm", llm.get),
+                  ("candidate_index", candidate_index.ensure_loaded)])
+
+@app.on_event("startup")
+def prepare_database():
+    # Schema changes are an explicit deploy step (`python -m core.migrations`); AUTO_MIGRATE=true is for development
+    try:
+        if get_setting("AUTO_MIGRATE", False):
+            migrate()
+        elif get_schema_version() < LATEST_SCHEMA_VERSION:
+            print(f"Database schema is behind version {LATEST_SCHEMA_VERSION}; run `python -m core.migrations`.")
+    except Exception as e:
+        print(f"Could not check the database schema: {e}")
+
+@app.on_event("startup")
+def start_warm_up():
+    # With MODEL_WARMUP=false models load on the first request that needs them (or the first /readyz)
+    if get_setting("MODEL_WARMUP", True):
+        warm_up.start()
+
+# Upper bound on /apply requests being processed at once; beyond it clients get a 503 and retry
+# later instead of every request slowing down behind a backed-up process pool
+apply_gate = AdmissionGate(get_setting("APPLY_MAX_IN_FLIGHT", 32))
+
+# Statistics already kept by the pool, cache, gate and index, read by /metrics at scrape time
+register_stats("db_pool", get_pool_stats, counters=("checkouts", "timeouts"), gauges=("in_use",))
+register_stats("feedback_cache", feedback_cache.stats, counters=("memory_hits", "db_hits", "misses", "stores", "evictions"),
+               gauges=("memory_entries",))
+register_stats("apply_admission", lambda: {"in_flight": apply_gate.in_flight, "limit": apply_gate.limit, "rejected": apply_gate.rejected},
+               counters=("rejected",), gauges=("in_flight", "limit"))
+register_stats("candidate_index", lambda: {"rows": len(candidate_index)}, gauges=("rows",))
+
+@app.on_event("startup")
+async def start_feedback_workers():
+    if get_setting("FEEDBACK_WORKERS_IN_API", True):
+        await feedback_workers.start()
+
+@app.on_event("shutdown")
+async def stop_feedback_workers():
+    await feedback_workers.stop(timeout=5)
+
+@app.on_event("shutdown")
+def stop_worker_processes():
+    shutdown_pools()
 
 # --- Pydantic Models for Request Bodies ---
 class JobPost(BaseModel):
@@ -37,72 +111,385 @@ class StatusUpdate(BaseModel):
     application_id: int
     new_status: str
 
+class StatusUpdateBatch(BaseModel):
+    updates: List[StatusUpdate]
+
+class ScoreWeights(BaseModel):
+    keyword: float = Field(ge=0)
+    semantic: float = Field(ge=0)
+    llm: float = Field(ge=0)
+
+class RescoreRequest(BaseModel):
+    description: Optional[str] = None
+    weights: Optional[ScoreWeights] = None
+    rerun_llm: bool = False
+
+# --- Helpers ---
+def load_job_analysis(job_id):
+    """Loads a job with its precomputed JD analysis, recomputing it if it was stored by an older version."""
+    job = get_job_analysis(job_id)
+    if job is None:
+        return None
+    if job['analysis_version'] != JD_ANALYSIS_VERSION or job['jd_embedding'] is None:
+        job['jd_keywords'], job['jd_embedding'] = analyze_job_description(job['description'], nlp.get(), semantic_model.get())
+        update_job_analysis(job_id, job['jd_keywords'], job['jd_embedding'], JD_ANALYSIS_VERSION)
+    return job
+
+def embed_resumes(resumes):
+    """Sets the missing whole-resume (and, in chunk modes, chunk) embeddings on the resume dicts in one batch.
+    Returns (resumes that got a new embedding, resumes that got new chunk embeddings)."""
+    need_vectors = [r for r in resumes if r['resume_embedding'] is None]
+    need_chunks = [r for r in resumes if SEMANTIC_SCORING != 'single' and r.get('chunk_embeddings') is None]
+    if need_vectors or need_chunks:
+        vectors, chunk_matrices = encode_resumes([r['resume_text'] for r in need_vectors], semantic_model.get(), get_setting("EMBED_BATCH_SIZE", 32),
+                                                 chunked_texts=[r['resume_text'] for r in need_chunks])
+        for resume, vector in zip(need_vectors, vectors):
+            resume['resume_embedding'] = vector
+        for resume, chunks in zip(need_chunks, chunk_matrices):
+            resume['chunk_embeddings'] = chunks
+    return need_vectors, need_chunks
+
+def save_pending_application(job_id, student_name, student_email, scores, analysis, resume, store_resume):
+    """Stores a provisionally scored application, and its resume if `store_resume`, and queues its LLM feedback.
+    Returns (application_id, resume_id); application_id is None if the candidate already applied."""
+    with transaction():
+        resume_id = upsert_resumes([resume], EMBEDDING_VERSION, CHUNK_VERSION)[resume['sha256']] if store_resume else resume['id']
+        application_id = add_application(job_id, student_name, student_email, scores, None, "Pending", resume_id,
+                                         analysis['project_mappings'], analysis['missing_keywords'], feedback_status='pending')
+        if application_id is not None:
+            enqueue_feedback_job(application_id)
+    return application_id, resume_id
+
 # --- API Endpoints ---
 
 # For Students
 @app.get("/jobs/")
-def read_jobs():
-    jobs_df = get_all_jobs()
-    return jobs_df.to_dict('records')
+def read_jobs(include_description: bool = False):
+    return get_all_jobs(include_description)
 
 @app.get("/student/applications/{email}")
 def read_student_applications(email: str):
-    apps_df = get_student_applications(email)
-    return apps_df.to_dict('records')
+    return get_student_applications(email)
 
 @app.post("/apply/{job_id}")
 async def apply_for_job(job_id: int, 
                         student_name: str = Form(...), 
                         student_email: str = Form(...), 
                         resume_file: UploadFile = File(...)):
-    
-    resume_contents = await resume_file.read()
-    resume_text = ""
-    # Use io.BytesIO to treat the byte string like a file
-    if resume_file.filename.endswith('.pdf'): resume_text = read_pdf(io.BytesIO(resume_contents))
-    elif resume_file.filename.endswith('.docx'): resume_text = read_docx(io.BytesIO(resume_contents))
-    else: resume_text = read_txt(io.BytesIO(resume_contents))
-
-    if "Error reading" in resume_text:
-        raise HTTPException(status_code=400, detail="Could not read the uploaded resume file.")
-
-    all_jobs_df = get_all_jobs()
-    job_series = all_jobs_df[all_jobs_df['id'] == job_id]
-    if job_series.empty:
-        raise HTTPException(status_code=404, detail="Job not found.")
-    job_description = job_series.iloc[0]['description']
+    """Scores and stores one application without blocking the event loop; LLM feedback follows in the background."""
+    if not apply_gate.try_enter():
+        raise HTTPException(status_code=503, detail="The server is busy. Please try again shortly.",
+                            headers={"Retry-After": str(get_setting("APPLY_RETRY_AFTER_SECONDS", 5))})
+    resume_path = None
+    try:
+        try:
+            with timed_stage("apply", "spool"):
+                resume_path, resume_sha256 = await run_in_threadpool(spool_to_tempfile, resume_file.file, os.path.splitext(resume_file.filename)[1],
+                                                      get_setting("PARSE_MAX_BYTES", 10 * 1024 * 1024))
+        except DocumentTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        observe_document(size_bytes=os.path.getsize(resume_path))
 
-    jd_keywords = improved_extract_keywords(job_description, nlp)
-    missing_keywords = [kw for kw in jd_keywords if kw not in resume_text.lower()]
-    raw_feedback = generate_ai_feedback_langchain(job_description, resume_text, missing_keywords, llm)
-    
-    llm_score, verdict, ai_feedback_text = 0.0, "N/A", raw_feedback
-    verdict_match = re.search(r"\*\*Verdict:\*\*\s*(.*)", raw_feedback)
-    if verdict_match: verdict = verdict_match.group(1).strip()
-    score_match = re.search(r"\*\*Overall Score:\*\*\s*(\d{1,3})", raw_feedback)
-    if score_match: llm_score = float(score_match.group(1))
-    feedback_match = re.search(r"\*\*Actionable Feedback:\*\*(.*)", raw_feedback, re.DOTALL)
-    if feedback_match: ai_feedback_text = feedback_match.group(1).strip()
-    
-    jd_embedding = semantic_model.encode(job_description, convert_to_tensor=True)
-    final_score, hard_score, soft_score = calculate_hybrid_score(jd_embedding, resume_text, jd_keywords, llm_score, semantic_model)
-    scores = {'final': final_score, 'semantic': soft_score, 'keyword': hard_score, 'llm': llm_score}
-    
-    projects = extract_projects(resume_text)
-    project_mappings = map_projects_to_jd(projects, jd_keywords)
-    
-    success = add_application(job_id, student_name, student_email, scores, ai_feedback_text, verdict, projects, project_mappings, missing_keywords)
-    
-    if not success:
-        raise HTTPException(status_code=409, detail="You have already applied for this job with this email address.")
-        
-    return {"message": "Application submitted successfully!", "score": final_score}
+        with timed_stage("apply", "job"):
+            job = await run_in_threadpool(load_job_analysis, job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job not found.")
+
+        with timed_stage("apply", "resume_lookup"):
+            resume = (await run_in_threadpool(get_resumes_by_hash, [resume_sha256], EMBEDDING_VERSION, CHUNK_VERSION)).get(resume_sha256)
+        if resume is None:
+            with timed_stage("apply", "extract"):
+                extraction = await run_in_threadpool(get_extraction_pool().extract, resume_path, resume_file.filename)
+            observe_document(extraction=extraction)
+            if not extraction.ok:
+                raise HTTPException(status_code=400, detail=f"Could not read the uploaded resume file. {extraction.error}")
+            resume = {'id': None, 'resume_text': extraction.text, 'projects': None, 'resume_embedding': None, 'chunk_embeddings': None}
+        resume['sha256'] = resume_sha256
+
+        # One pass of the job's compiled keyword matcher yields the keyword score, the missing
+        # keywords and the per-project matches
+        with timed_stage("apply", "keywords"):
+            analysis = await run_in_process_pool(analyze_resume, resume['resume_text'], job['jd_keywords'], resume['projects'])
+        resume['projects'] = analysis['projects']
+
+        # The LLM part of the score is filled in later by the feedback workers; until then the
+        # final score is provisional (keyword + semantic only)
+        # New file, or one embedded by an older model or chunking: (re-)store it with the current embeddings
+        with timed_stage("apply", "embed"):
+            new_vectors, new_chunks = await run_in_threadpool(embed_resumes, [resume])
+        embedded_now = bool(new_vectors)
+        with timed_stage("apply", "score"):
+            soft_score = resume_semantic_score(job['jd_embedding'], resume)
+            final_score = combine_scores(analysis['keyword_score'], soft_score, None, job['weights'])
+        scores = {'final': final_score, 'semantic': soft_score, 'keyword': analysis['keyword_score'], 'llm': None}
+
+        with timed_stage("apply", "insert"):
+            application_id, resume_id = await run_in_threadpool(save_pending_application, job_id, student_name, student_email,
+                                                                scores, analysis, resume, resume['id'] is None or embedded_now or bool(new_chunks))
+        if embedded_now:
+            with timed_stage("apply", "index"):
+                await run_in_threadpool(candidate_index.add, [resume_id], [resume['resume_embedding']])
+        if application_id is None:
+            raise HTTPException(status_code=409, detail="You have already applied for this job with this email address.")
+        feedback_workers.notify()
+    finally:
+        apply_gate.leave()
+        if resume_path is not None:
+            os.remove(resume_path)
+
+    return {"message": "Application submitted successfully!", "application_id": application_id, "score": final_score, "feedback_status": "pending"}
 
 # For Placement Team
 @app.post("/jobs/new")
 def create_job(job: JobPost):
-    add_job(job.title, job.description)
-    return {"message": "Job created successfully"}
+    jd_keywords, jd_embedding = analyze_job_description(job.description, nlp.get(), semantic_model.get())
+    job_id = add_job(job.title, job.description, jd_keywords, jd_embedding, JD_ANALYSIS_VERSION)
+    return {"message": "Job created successfully", "job_id": job_id}
+
+@app.post("/jobs/reanalyze")
+def reanalyze_jobs():
+    """Recomputes the stored JD analysis of every job produced by an older extractor/model version,
+    with one nlp.pipe pass and one batched encode over all of them."""
+    stale_jobs = get_stale_jobs(JD_ANALYSIS_VERSION)
+    analyses = analyze_job_descriptions([description for _, description in stale_jobs], nlp.get(), semantic_model.get())
+    update_job_analyses([(job_id, jd_keywords, jd_embedding) for (job_id, _), (jd_keywords, jd_embedding) in zip(stale_jobs, analyses)],
+                        JD_ANALYSIS_VERSION)
+    stale_job_ids = [job_id for job_id, _ in stale_jobs]
+    return {"message": f"Re-analyzed {len(stale_job_ids)} job(s)", "job_ids": stale_job_ids}
+
+@app.post("/jobs/{job_id}/applications/bulk")
+def bulk_apply_for_job(job_id: int, resume_files: List[UploadFile] = File(...)):
+    """Ingests a batch of resumes (files and/or zip archives) for one job, reporting each file's outcome."""
+    total_start = time.perf_counter()
+    job = load_job_analysis(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+
+    max_files = get_setting("BULK_MAX_FILES", 1000)
+    max_file_bytes = get_setting("PARSE_MAX_BYTES", 10 * 1024 * 1024)
+    with tempfile.TemporaryDirectory(prefix="bulk-") as spool_dir:
+        # Every upload is spooled to disk and archives are unpacked there, so only one chunk of a
+        # file is ever held in memory before extraction
+        uploads = []
+        for upload in resume_files:
+            is_archive = upload.filename.lower().endswith('.zip')
+            try:
+                path, sha256 = spool_to_tempfile(upload.file, os.path.splitext(upload.filename)[1],
+                                         get_setting("BULK_MAX_ARCHIVE_BYTES", 500 * 1024 * 1024) if is_archive else max_file_bytes, spool_dir)
+            except DocumentTooLarge as e:
+                raise HTTPException(status_code=413, detail=f"{upload.filename}: {e}")
+            if is_archive:
+                try:
+                    uploads.extend(unpack_resume_archive(path, spool_dir, max_files, get_setting("BULK_MAX_ARCHIVE_BYTES", 500 * 1024 * 1024)))
+                except Exception as e:
+                    raise HTTPException(status_code=400, detail=f"Could not unpack {upload.filename}: {e}")
+                os.remove(path)
+            else:
+                uploads.append((upload.filename, path, sha256))
+        if len(uploads) > max_files:
+            raise HTTPException(status_code=413, detail=f"At most {max_files} resumes can be uploaded at once.")
+
+        # Files seen before (in this batch or any earlier upload) are only parsed once
+        with timed_stage("bulk", "parse") as parse_timer:
+            stored = get_resumes_by_hash({sha256 for _, _, sha256 in uploads}, EMBEDDING_VERSION, CHUNK_VERSION)
+            to_parse = {}
+            for filename, path, sha256 in uploads:
+                observe_document(size_bytes=os.path.getsize(path))
+                if sha256 not in stored:
+                    to_parse.setdefault(sha256, (path, filename))
+            parsed = dict(zip(to_parse, get_extraction_pool().map(list(to_parse.values()))))
+        for item in parsed.values():
+            observe_document(extraction=item)
+
+    report, candidates, seen_emails, parsed_resumes = [], [], set(), {}
+    for filename, _, sha256 in uploads:
+        entry = {'filename': filename}
+        report.append(entry)
+        if sha256 in stored:
+            entry['reused'] = True
+            resume = stored[sha256]
+            resume['sha256'] = sha256
+        else:
+            item = parsed[sha256]
+            entry['parse_seconds'] = round(item.parse_seconds, 4)
+            if not item.ok:
+                entry.update(status='error', error=item.error)
+                continue
+            if item.truncated:
+                entry['truncated'] = True
+            resume = parsed_resumes.setdefault(sha256, {'sha256': sha256, 'resume_text': item.text, 'projects': None,
+                                                        'resume_embedding': None, 'chunk_embeddings': None})
+        name, email = extract_candidate_contact(resume['resume_text'], filename.rsplit('.', 1)[0])
+        if email is None:
+            entry.update(status='error', error="No email address found in the resume.")
+            continue
+        if email in seen_emails:
+            entry.update(status='duplicate', candidate_email=email, error="Same email appears earlier in this batch.")
+            continue
+        seen_emails.add(email)
+        entry.update(candidate_name=name, candidate_email=email)
+        candidates.append((entry, sha256, resume))
+
+    # Only embeddings missing for the current model/chunking are encoded, each distinct file once
+    with timed_stage("bulk", "embed") as embed_timer:
+        new_vectors, new_chunks = embed_resumes(list({sha256: resume for _, sha256, resume in candidates}.values()))
+        to_store = {resume['sha256']: resume for resume in new_vectors + new_chunks}
+        if not candidates:
+            soft_scores = []
+        elif SEMANTIC_SCORING == 'single':
+            soft_scores = np.stack([resume['resume_embedding'] for _, _, resume in candidates]) @ job['jd_embedding'] * 100
+        else:
+            soft_scores = [resume_semantic_score(job['jd_embedding'], resume) for _, _, resume in candidates]
+
+    with timed_stage("bulk", "score") as score_timer:
+        applications = []
+        matcher = get_keyword_matcher(job['jd_keywords'])
+        for (entry, sha256, resume), soft_score in zip(candidates, soft_scores):
+            if resume['projects'] is None:
+                resume['projects'] = extract_projects(resume['resume_text'])
+            projects = resume['projects']
+            match = matcher.scan(resume['resume_text'], projects)
+            final_score = combine_scores(match.score, float(soft_score), None, job['weights'])
+            entry['score'] = round(final_score, 2)
+            applications.append({
+                'candidate_name': entry['candidate_name'], 'candidate_email': entry['candidate_email'], 'sha256': sha256,
+                'scores': {'final': final_score, 'semantic': float(soft_score), 'keyword': match.score},
+                'project_mappings': match.project_matches, 'missing_keywords': match.missing,
+            })
+
+    with timed_stage("bulk", "insert") as insert_timer, transaction():
+        resume_ids = {sha256: resume['id'] for sha256, resume in stored.items()}
+        resume_ids.update(upsert_resumes(to_store.values(), EMBEDDING_VERSION, CHUNK_VERSION))
+        for application in applications:
+            application['resume_id'] = resume_ids[application['sha256']]
+        application_ids = add_applications_bulk(job_id, applications)
+    if new_vectors:
+        candidate_index.add([resume_ids[resume['sha256']] for resume in new_vectors], [resume['resume_embedding'] for resume in new_vectors])
+    for entry, _, _ in candidates:
+        application_id = application_ids.get(entry['candidate_email'])
+        if application_id is None:
+            entry.update(status='duplicate', error="This candidate has already applied for this job.")
+        else:
+            entry.update(status='created', application_id=application_id)
+    if application_ids:
+        feedback_workers.notify()
+
+    return {
+        "created": len(application_ids),
+        "skipped": sum(1 for entry in report if entry['status'] != 'created'),
+        "timings": {
+            "parse_seconds": round(parse_timer.seconds, 4), "embed_seconds": round(embed_timer.seconds, 4),
+            "score_seconds": round(score_timer.seconds, 4), "insert_seconds": round(insert_timer.seconds, 4),
+            "total_seconds": round(time.perf_counter() - total_start, 4),
+        },
+        "files": report,
+    }
+
+@app.get("/jobs/{job_id}/recommended-candidates")
+def recommend_candidates(job_id: int, k: int = 50):
+    """Best-matching candidates from every stored resume for this job's JD, excluding people who
+    already applied to it. One matrix-vector product over the candidate index plus top-k selection."""
+    job = load_job_analysis(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    k = max(1, min(k, 500))
+    already_applied = get_applicant_emails(job_id)
+    # A candidate can have several applications (one per job), so over-fetch and de-duplicate by email
+    fetch = k * 4
+    while True:
+        hits = candidate_index.search(job['jd_embedding'], fetch + len(already_applied))
+        details = get_candidates_for_resumes([resume_id for resume_id, _ in hits])
+        recommendations, seen = [], set(already_applied)
+        for resume_id, similarity in hits:
+            candidate = details.get(resume_id)
+            if candidate is None or candidate['candidate_email'] in seen:
+                continue
+            seen.add(candidate['candidate_email'])
+            recommendations.append({**candidate, 'resume_id': resume_id, 'semantic_score': round(similarity * 100, 2)})
+        if len(recommendations) >= k or len(hits) < fetch + len(already_applied):
+            return recommendations[:k]
+        fetch *= 4
+
+@app.post("/jobs/{job_id}/rescore")
+def rescore_job(job_id: int, request: RescoreRequest):
+    """Re-ranks every application to a job after a JD edit and/or a weight change, reusing stored scores and embeddings."""
+    start = time.perf_counter()
+    job = load_job_analysis(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+
+    jd_changed = request.description is not None and request.description != job['description']
+    if request.weights is not None:
+        total = request.weights.keyword + request.weights.semantic + request.weights.llm
+        if total <= 0:
+            raise HTTPException(status_code=400, detail="At least one weight must be positive.")
+        # Scaled to sum to 1 so final_score stays on the 0-100 scale thresholds and buckets assume
+        job['weights'] = {'keyword': request.weights.keyword / total, 'semantic': request.weights.semantic / total,
+                          'llm': request.weights.llm / total}
+    if jd_changed:
+        job['description'] = request.description
+        job['jd_keywords'], job['jd_embedding'] = analyze_job_description(request.description, nlp.get(), semantic_model.get())
+
+    applications = get_applications_for_rescoring(job_id, EMBEDDING_VERSION, CHUNK_VERSION)
+    soft_scores = np.array([a['semantic_score'] or 0.0 for a in applications], dtype=np.float32)
+    hard_scores = np.array([a['keyword_score'] or 0.0 for a in applications], dtype=np.float32)
+    missing_keywords = [a['missing_keywords'] for a in applications]
+    project_mappings = [None] * len(applications)
+    new_vectors, new_chunks = [], []
+    if jd_changed:
+        # Legacy applications without a stored resume have nothing to rescore against; they keep
+        # their stored component scores and only get the new weights
+        rescored = [i for i, a in enumerate(applications) if a['resume_id'] is not None]
+        # Resumes stored without embeddings from the current model/chunking: encode each once and persist them
+        resumes = {}
+        for i in rescored:
+            resumes.setdefault(applications[i]['resume_id'], applications[i])
+        new_vectors, new_chunks = embed_resumes(list(resumes.values()))
+        for i in rescored:
+            resume = resumes[applications[i]['resume_id']]
+            applications[i]['resume_embedding'], applications[i]['chunk_embeddings'] = resume['resume_embedding'], resume['chunk_embeddings']
+        if rescored:
+            current = [applications[i] for i in rescored]
+            if SEMANTIC_SCORING == 'single':
+                soft_scores[rescored] = np.stack([a['resume_embedding'] for a in current]) @ job['jd_embedding'] * 100
+            else:
+                soft_scores[rescored] = [resume_semantic_score(job['jd_embedding'], a) for a in current]
+            matcher = get_keyword_matcher(job['jd_keywords'])
+            for i, a in zip(rescored, current):
+                match = matcher.scan(a['resume_text'], a['projects'])
+                hard_scores[i], missing_keywords[i], project_mappings[i] = match.score, match.missing, match.project_matches
+
+    has_llm = np.array([a['llm_score'] is not None for a in applications], dtype=bool)
+    llm_scores = np.array([a['llm_score'] or 0.0 for a in applications], dtype=np.float32)
+    final_scores = np.where(has_llm, combine_scores(hard_scores, soft_scores, llm_scores, job['weights']),
+                            combine_scores(hard_scores, soft_scores, None, job['weights']))
+    rows = [(a['id'], float(hard), float(soft), float(final), missing, mappings)
+            for a, hard, soft, final, missing, mappings in zip(applications, hard_scores, soft_scores, final_scores, missing_keywords, project_mappings)]
+
+    # Legacy applications have no resume to give the LLM
+    application_ids = [a['id'] for a in applications if a['resume_id'] is not None]
+    with transaction():
+        if jd_changed:
+            update_job_description(job_id, job['description'], job['jd_keywords'], job['jd_embedding'], JD_ANALYSIS_VERSION)
+            update_resume_embeddings([(a['resume_id'], a['resume_embedding']) for a in new_vectors], EMBEDDING_VERSION)
+            update_resume_chunk_embeddings([(a['resume_id'], a['chunk_embeddings']) for a in new_chunks], CHUNK_VERSION)
+        if request.weights is not None:
+            update_job_weights(job_id, job['weights'])
+        update_application_scores(rows)
+        if request.rerun_llm:
+            enqueue_feedback_jobs(application_ids)
+    if new_vectors:
+        candidate_index.add([a['resume_id'] for a in new_vectors], [a['resume_embedding'] for a in new_vectors])
+    if request.rerun_llm and application_ids:
+        feedback_workers.notify()
+
+    return {
+        "message": f"Rescored {len(rows)} application(s)",
+        "weights": job['weights'],
+        "jd_changed": jd_changed,
+        "llm_requeued": len(application_ids) if request.rerun_llm else 0,
+        "seconds": round(time.perf_counter() - start, 4),
+    }
 
 @app.delete("/jobs/{job_id}")
 def remove_job(job_id: int):
@@ -110,16 +497,122 @@ def remove_job(job_id: int):
     return {"message": f"Job {job_id} deleted successfully"}
 
 @app.get("/jobs/{job_id}/applications")
-def read_job_applications(job_id: int):
-    apps_df = get_applications_for_job(job_id)
-    return apps_df.to_dict('records')
+def read_job_applications(job_id: int, limit: int = Query(50, ge=1, le=500), cursor: Optional[str] = None,
+                          status: Optional[str] = None, min_score: Optional[float] = None, max_score: Optional[float] = None):
+    """A page of the job's applications, best first. Pass the returned next_cursor to get the next page."""
+    try:
+        items, next_cursor = get_applications_for_job(job_id, limit, cursor, status, min_score, max_score)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+    return {"items": items, "next_cursor": next_cursor}
     
+@app.get("/jobs/{job_id}/stats")
+def read_job_stats(job_id: int, thresholds: str = "50,60,70,80,90", top_keywords: int = Query(20, ge=1, le=200)):
+    """Score distribution, status counts, shortlist preview at each of the comma-separated
+    `thresholds` and the most commonly missing keywords, from incrementally maintained aggregates."""
+    try:
+        threshold_values = [int(t) for t in thresholds.split(",") if t.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Thresholds must be comma-separated integers.")
+    if any(not 0 <= t <= 100 for t in threshold_values):
+        raise HTTPException(status_code=400, detail="Thresholds must be between 0 and 100.")
+    stats = get_job_stats(job_id, threshold_values, top_keywords)
+    if stats is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return stats
+
+@app.get("/applications/shortlist/{job_id}/preview")
+def preview_bulk_shortlist(job_id: int, threshold: int = Query(..., ge=0, le=100)):
+    """How many 'Applied' candidates a bulk shortlist at `threshold` would shortlist and reject."""
+    shortlisted, not_shortlisted = preview_shortlist(job_id, threshold)
+    return {"threshold": threshold, "shortlisted": shortlisted, "not_shortlisted": not_shortlisted}
+
 @app.post("/applications/shortlist/{job_id}")
 def apply_bulk_shortlist(job_id: int, threshold: int = Form(...)):
-    shortlist_candidates(job_id, threshold)
-    return {"message": "Bulk shortlist applied successfully"}
+    shortlisted, not_shortlisted = shortlist_candidates(job_id, threshold)
+    return {"message": "Bulk shortlist applied successfully", "shortlisted": shortlisted, "not_shortlisted": not_shortlisted}
 
 @app.put("/applications/status")
 def change_candidate_status(update: StatusUpdate):
     update_candidate_status(update.application_id, update.new_status)
-    return {"message": "Status updated successfully"}
\ No newline at end of file
+    return {"message": "Status updated successfully"}
+
+@app.put("/applications/status/batch")
+def change_candidate_statuses(batch: StatusUpdateBatch):
+    """Applies several status changes (e.g. everything edited on one dashboard page) in one UPDATE."""
+    updated = update_candidate_statuses([(update.application_id, update.new_status) for update in batch.updates])
+    return {"message": f"Updated {updated} application(s)", "updated": updated}
+
+@app.get("/dashboard")
+def read_dashboard(limit: int = Query(50, ge=1, le=500), cursor: List[str] = Query([])):
+    """All jobs, each with one page of its applications (best first). Page a job with `cursor=<job_id>:<next_cursor>`."""
+    try:
+        job_cursors = {}
+        for value in cursor:
+            job_id, job_cursor = value.split(":", 1)
+            job_cursors[int(job_id)] = job_cursor
+        return get_dashboard(limit, job_cursors)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+
+@app.get("/search/applications")
+def search_all_applications(q: Optional[str] = None, skill: List[str] = Query([]), min_score: Optional[float] = None,
+                            max_score: Optional[float] = None, job_id: List[int] = Query([]), status: Optional[str] = None,
+                            limit: int = Query(50, ge=1, le=500), cursor: Optional[str] = None):
+    """Applications across all jobs matching a full-text query `q` (web-search syntax) and/or every
+    `skill`, optionally within a score range, jobs and status. Ranked by text relevance when `q`
+    is given, otherwise best score first; pass the returned next_cursor to get the next page.
+    `truncated` means `q` matched more applications than are ranked (SEARCH_RANK_WINDOW); narrow it down."""
+    try:
+        items, next_cursor, truncated = search_applications(q.strip() if q else None, skill, min_score, max_score, job_id, status, limit, cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+    return {"items": items, "next_cursor": next_cursor, "truncated": truncated}
+
+# For Operations
+@app.get("/healthz")
+def health():
+    """Liveness: the process is up and serving requests."""
+    return {"status": "ok"}
+
+@app.get("/readyz")
+def readiness():
+    """Readiness: models and the candidate index are loaded and the database is reachable and migrated.
+    Answers 503 until then; the first call also starts loading anything not loaded yet. Also
+    reports how long each model that has loaded took to load."""
+    warm_up.start()
+    # Read before the status so a task finishing in between can't make `ready` disagree with `checks`
+    models_ready = warm_up.ready
+    checks = warm_up.status()
+    try:
+        schema_version = get_schema_version()
+        checks['database'] = 'ready' if schema_version >= LATEST_SCHEMA_VERSION else \
+            f"schema at version {schema_version}, expected {LATEST_SCHEMA_VERSION}"
+    except Exception as e:
+        checks['database'] = f"unreachable: {e}"
+    ready = models_ready and checks['database'] == 'ready'
+    load_seconds = {model.name: round(model.load_seconds, 3) for model in (nlp, semantic_model, llm) if model.load_seconds is not None}
+    return JSONResponse(status_code=200 if ready else 503, content={"ready": ready, "checks": checks, "load_seconds": load_seconds})
+
+@app.get("/metrics")
+def read_metrics():
+    """Prometheus metrics of this worker process: stage, LLM, database and request timings."""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+@app.get("/db/pool-stats")
+def read_pool_stats():
+    return get_pool_stats()
+
+@app.get("/cache/feedback-stats")
+def read_feedback_cache_stats():
+    return feedback_cache.stats()
+
+@app.get("/llm/token-stats")
+def read_llm_token_stats():
+    """Prompt/response tokens of the stored feedback and the prompt tokens saved by the token budget."""
+    return get_feedback_token_stats()
+
+@app.get("/apply/admission-stats")
+def read_admission_stats():
+    return {"in_flight": apply_gate.in_flight, "limit": apply_gate.limit, "rejected": apply_gate.rejected}
@@ -0,0 +1,43 @@
+# Checks the page and character budgets of extract_document on a generated DOCX
+import docx
+from core.document_processor import extract_document, DOCX_PARAGRAPHS_PER_PAGE
+
+def make_docx(path, pages):
+    document = docx.Document()
+    for i in range(pages * DOCX_PARAGRAPHS_PER_PAGE):
+        document.add_paragraph(f"line {i:04d}")
+    document.save(path)
+    return str(path)
+
+# --- No budgets: every page is read ---
+def test_reads_all_pages(tmp_path):
+    path = make_docx(tmp_path / "resume.docx", 3)
+    result = extract_document(path, "resume.docx")
+    assert result.ok and result.pages == 3 and not result.truncated
+    assert "line 0149" in result.text
+
+# --- Page budget ---
+def test_page_budget_truncates(tmp_path):
+    path = make_docx(tmp_path / "resume.docx", 3)
+    result = extract_document(path, "resume.docx", max_pages=2)
+    assert result.pages == 2 and result.truncated
+    assert "line 0099" in result.text and "line 0100" not in result.text
+
+def test_page_budget_equal_to_page_count_is_not_truncated(tmp_path):
+    path = make_docx(tmp_path / "resume.docx", 2)
+    result = extract_document(path, "resume.docx", max_pages=2)
+    assert result.pages == 2 and not result.truncated
+
+# --- Character budget: the page it cuts into is counted ---
+def test_char_budget_counts_partial_page(tmp_path):
+    path = make_docx(tmp_path / "resume.docx", 3)
+    page_chars = len(extract_document(path, "resume.docx", max_pages=1).text)
+    result = extract_document(path, "resume.docx", max_chars=page_chars + 20)
+    assert result.truncated and result.pages == 2
+    assert len(result.text) == page_chars + 20 + 1  # plus the newline joining the pages
+
+# --- Byte budget ---
+def test_byte_budget_rejects_file(tmp_path):
+    path = make_docx(tmp_path / "resume.docx", 1)
+    result = extract_document(path, "resume.docx", max_bytes=10)
+    assert not result.ok and result.error_code == 'too_large'
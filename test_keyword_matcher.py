@@ -0,0 +1,50 @@
+# Checks token normalization and JD keyword matching in the keyword matcher
+from core.keyword_matcher import normalize_token, tokenize, skill_terms, KeywordMatcher, get_keyword_matcher
+
+# --- Normalization ---
+def test_plurals_fold_to_singular():
+    assert normalize_token("developers") == "developer"
+    assert normalize_token("libraries") == "library"
+    assert normalize_token("batches") == "batch"
+    assert normalize_token("analyses") == normalize_token("analysis") == "analysis"
+
+def test_short_and_latin_endings_kept():
+    assert normalize_token("aws") == "aws"
+    assert normalize_token("class") == "class"
+    assert normalize_token("status") == "status"
+
+def test_tech_names_untouched():
+    assert normalize_token("node.js") == "node.js"
+    assert normalize_token("asp.net") == "asp.net"
+    assert normalize_token("c++") == "c++"
+    assert tokenize("Node.js, C++ and C# developers") == ["node.js", "c++", "and", "c#", "developer"]
+
+def test_skill_terms_drop_numbers_and_single_letters():
+    assert skill_terms("R and C, 2 years of Go, x") == ["c", "go", "r", "year"]
+
+def test_skill_terms_drop_stop_words():
+    assert skill_terms("Experience with Python and Node.js on the AWS platform") == ["aws", "node.js", "python"]
+
+# --- Matching ---
+def test_whole_token_matching():
+    result = KeywordMatcher(["java", "node.js", "sql"]).scan("Built JavaScript apps on Node.js")
+    assert result.matched == ["node.js"]
+    assert result.missing == ["java", "sql"]
+    assert round(result.score, 2) == 33.33
+
+def test_multi_token_keywords_and_plurals():
+    result = KeywordMatcher(["machine learning", "data analysis", "microservice"]).scan("Machine learning, data analyses and microservices")
+    assert result.matched == ["machine learning", "data analysis", "microservice"]
+    assert result.score == 100
+
+def test_project_matches_reported_per_line():
+    projects = ["Chat app with React and Firebase"]
+    text = "SKILLS\nPython\nPROJECTS\n" + projects[0]
+    result = KeywordMatcher(["python", "react", "firebase"]).scan(text, projects)
+    assert result.project_matches == {projects[0]: ["react", "firebase"]}
+
+def test_empty_keywords_score_zero():
+    assert KeywordMatcher([]).scan("anything").score == 0
+
+def test_matcher_cached_per_keyword_list():
+    assert get_keyword_matcher(["python", "sql"]) is get_keyword_matcher(["python", "sql"])
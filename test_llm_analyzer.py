@@ -0,0 +1,50 @@
+# Checks resume chunking and the weighted score combination
+import numpy as np
+from core.llm_analyzer import chunk_resume, combine_scores, split_resume_sections
+
+RESUME = """Jane Doe
+jane@example.com
+SKILLS
+Python, SQL, Docker
+EXPERIENCE
+Built data pipelines for billing
+Migrated reporting to Postgres
+"""
+
+# --- Sections and chunks ---
+def test_sections_split_on_headings():
+    assert split_resume_sections(RESUME) == [
+        ("", ["Jane Doe", "jane@example.com"]),
+        ("SKILLS", ["Python, SQL, Docker"]),
+        ("EXPERIENCE", ["Built data pipelines for billing", "Migrated reporting to Postgres"]),
+    ]
+
+def test_chunks_keep_section_headings():
+    assert chunk_resume(RESUME, max_words=20) == [
+        "Jane Doe jane@example.com",
+        "SKILLS\nPython, SQL, Docker",
+        "EXPERIENCE\nBuilt data pipelines for billing Migrated reporting to Postgres",
+    ]
+
+def test_chunks_never_exceed_max_words():
+    chunks = chunk_resume(RESUME, max_words=4)
+    assert chunks[2:] == ["EXPERIENCE\nBuilt data pipelines for", "EXPERIENCE\nbilling", "EXPERIENCE\nMigrated reporting to Postgres"]
+    assert all(len(chunk.split("\n")[-1].split()) <= 4 for chunk in chunks)
+
+def test_chunk_cap_and_empty_resume():
+    assert len(chunk_resume(RESUME, max_words=2, max_chunks=3)) == 3
+    assert chunk_resume("") == [""]
+
+# --- Score combination ---
+WEIGHTS = {'keyword': 0.3, 'semantic': 0.5, 'llm': 0.2}
+
+def test_combined_with_llm_score():
+    assert combine_scores(50, 80, 100, WEIGHTS) == 0.3 * 50 + 0.5 * 80 + 0.2 * 100
+
+def test_pending_llm_score_renormalizes():
+    assert combine_scores(50, 80, None, WEIGHTS) == (0.3 * 50 + 0.5 * 80) / 0.8
+    assert combine_scores(50, 80, None, {'keyword': 0, 'semantic': 0, 'llm': 1}) == 0
+
+def test_combines_arrays_elementwise():
+    combined = combine_scores(np.array([0.0, 100.0]), np.array([100.0, 0.0]), None, WEIGHTS)
+    assert np.allclose(combined, [62.5, 37.5])
@@ -1,5 +1,5 @@
 # Import the function you need from your other file
-from core.document_processor import get_text_from_pdf
+from core.document_processor import extract_document
 
 # --- IMPORTANT ---
 # Change these paths to match the names of your two PDF files
@@ -8,17 +8,19 @@ PDF_FILE_2 = "data/resumes/Prasobh_Ratna_Shakya_Resume.pdf"
 
 # --- Test the first PDF ---
 print(f"--- Testing PDF File 1: {PDF_FILE_1} ---")
-pdf_text_1 = get_text_from_pdf(PDF_FILE_1)
-if pdf_text_1:
+result_1 = extract_document(PDF_FILE_1, PDF_FILE_1)
+pdf_text_1 = result_1.text
+if result_1.ok and pdf_text_1:
     # Print only the first 300 characters to keep the output clean
     print(pdf_text_1[:300])
 else:
-    print("Could not read the file. Check the path and filename.")
+    print(f"Could not read the file. Check the path and filename. {result_1.error or ''}")
 
 # --- Test the second PDF ---
 print(f"\n--- Testing PDF File 2: {PDF_FILE_2} ---")
-pdf_text_2 = get_text_from_pdf(PDF_FILE_2)
-if pdf_text_2:
+result_2 = extract_document(PDF_FILE_2, PDF_FILE_2)
+pdf_text_2 = result_2.text
+if result_2.ok and pdf_text_2:
     print(pdf_text_2[:300])
 else:
-    print("Could not read the file. Check the path and filename.")
\ No newline at end of file
+    print(f"Could not read the file. Check the path and filename. {result_2.error or ''}")
\ No newline at end of file
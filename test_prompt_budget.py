@@ -0,0 +1,43 @@
+# Checks that feedback prompts are cleaned and cut to their token budgets by relevance to the JD
+from core.prompt_budget import clean_text, select_relevant_sections, budget_feedback_inputs
+from core.metrics import estimate_tokens
+
+RESUME = "\n".join([
+    "Jane Doe",
+    "SKILLS",
+    "Python, Kubernetes, Terraform, AWS",
+    "EXPERIENCE",
+    "Ran Kubernetes clusters on AWS with Terraform",
+    "HOBBIES",
+    "Painting watercolours, hiking in the hills, baking sourdough bread every weekend " * 4,
+])
+JD_KEYWORDS = ["kubernetes", "terraform", "aws"]
+
+# --- Cleaning ---
+def test_clean_text_drops_artifacts_and_boilerplate():
+    text = "Page 1 of 2\nPython  devel-\noper\u00ad\n\n\n\nReferences available on request\n---\nSQL"
+    assert clean_text(text) == "Python developer\n\nSQL"
+
+def test_repeated_header_kept_once():
+    text = "ACME Corp CV\nPython\nACME Corp CV\nSQL\nACME Corp CV\nGo"
+    assert clean_text(text) == "ACME Corp CV\nPython\nSQL\nGo"
+
+# --- Relevance selection ---
+def test_text_within_budget_unchanged():
+    assert select_relevant_sections(RESUME, 10_000, JD_KEYWORDS) == RESUME
+
+def test_relevant_sections_kept_in_order():
+    selected = select_relevant_sections(RESUME, 40, JD_KEYWORDS)
+    assert estimate_tokens(selected) <= 40
+    assert selected == "Jane Doe\nSKILLS\nPython, Kubernetes, Terraform, AWS\nEXPERIENCE\nRan Kubernetes clusters on AWS with Terraform"
+
+def test_falls_back_to_leading_lines():
+    selected = select_relevant_sections("HOBBIES\n" + "word " * 400, 5, JD_KEYWORDS)
+    assert selected and estimate_tokens(selected) <= 5
+
+# --- Feedback prompt ---
+def test_budget_feedback_inputs_caps_both_texts():
+    jd = "We need Kubernetes, Terraform and AWS.\n" + "Benefits and perks line.\n" * 200
+    jd_text, resume_text = budget_feedback_inputs(jd, RESUME, JD_KEYWORDS, resume_max_tokens=40, jd_max_tokens=30)
+    assert estimate_tokens(jd_text) <= 30 and jd_text.startswith("We need Kubernetes")
+    assert "Painting" not in resume_text and "Kubernetes clusters" in resume_text
@@ -0,0 +1,55 @@
+# Rescores a job whose applications mix legacy rows (no stored resume) and current ones.
+# Needs a throwaway Postgres database, which is EMPTIED:
+#     TEST_DATABASE_URL=postgresql://localhost/resume_test python -m pytest test_rescore.py
+import os
+import pytest
+
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+pytestmark = pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL is not set")
+
+RESUME = "Jane Doe jane@example.com\nPROJECTS\nInventory API: a java service with docker\nChat bot: python and sql backend\n"
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", TEST_DATABASE_URL)
+    monkeypatch.setenv("CANDIDATE_INDEX_DIR", str(tmp_path / "index"))
+    for name, value in [("AUTO_MIGRATE", "true"), ("MODEL_WARMUP", "false"), ("FEEDBACK_WORKERS_IN_API", "false")]:
+        monkeypatch.setenv(name, value)
+    import psycopg2
+    conn = psycopg2.connect(TEST_DATABASE_URL)
+    conn.autocommit = True
+    conn.cursor().execute("DROP SCHEMA public CASCADE; CREATE SCHEMA public")
+    conn.close()
+    from fastapi.testclient import TestClient
+    import main
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+def test_rescore_keeps_legacy_scores(client):
+    from core.database import transaction
+    assert client.post("/jobs/new", json={"title": "Backend", "description": "python sql developer"}).status_code == 200
+    response = client.post("/apply/1", data={"student_name": "Jane", "student_email": "jane@example.com"},
+                           files={"resume_file": ("jane.txt", RESUME.encode(), "text/plain")})
+    assert response.status_code == 200
+    # An application from before resumes were stored separately
+    with transaction() as cursor:
+        cursor.execute("""
+            INSERT INTO applications (job_id, timestamp, candidate_name, candidate_email, keyword_score, semantic_score, final_score)
+            VALUES (1, now(), 'Legacy', 'legacy@example.com', 40, 60, 54) RETURNING id
+        """)
+        legacy_id = cursor.fetchone()[0]
+
+    response = client.post("/jobs/1/rescore", json={"description": "java docker engineer", "weights": {"keyword": 1, "semantic": 1, "llm": 0},
+                                                     "rerun_llm": True})
+    assert response.status_code == 200
+    assert response.json()["message"] == "Rescored 2 application(s)"
+    assert response.json()["llm_requeued"] == 1
+
+    with transaction() as cursor:
+        cursor.execute("SELECT id, keyword_score, semantic_score, final_score, missing_keywords FROM applications ORDER BY id")
+        rows = {row[0]: row[1:] for row in cursor.fetchall()}
+    # The legacy row keeps its component scores and is only reweighted
+    assert rows.pop(legacy_id)[:3] == (40, 60, 50)
+    (keyword_score, semantic_score, final_score, missing_keywords), = rows.values()
+    assert keyword_score > 0 and not {'java', 'docker'} & set(missing_keywords)
+    assert final_score == pytest.approx((keyword_score + semantic_score) / 2, abs=0.01)